@@ -0,0 +1,4 @@
+"""Безголовые бенчмарки карты и редактора.
+
+Запуск: python -m benchmarks.run (см. --help).
+"""
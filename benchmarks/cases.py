@@ -0,0 +1,166 @@
+import json
+import os
+import tempfile
+import pygame
+from world.map import Map
+from world.mapfile import load_json_map, load_map_file, open_map_file, save_map_file
+
+# Размеры карт из экрана параметров редактора
+MAP_SIZE_PRESETS = [32, 48, 64, 96, 128, 256]
+
+# имя -> функция подготовки, возвращающая замеряемый вызов без аргументов
+CASES = {}
+# Временные каталоги подготовленных бенчмарков, удаляются в cleanup()
+TEMP_DIRS = []
+
+
+def case(name):
+    """Регистрирует функцию подготовки бенчмарка под именем name"""
+    def decorator(setup):
+        CASES[name] = setup
+        return setup
+    return decorator
+
+
+def temp_path(filename):
+    """Путь к файлу в новом временном каталоге, который живет до cleanup()"""
+    directory = tempfile.TemporaryDirectory(prefix="selectown-bench-")
+    TEMP_DIRS.append(directory)
+    return os.path.join(directory.name, filename)
+
+
+def cleanup():
+    """Удаляет временные каталоги, созданные при подготовке бенчмарков"""
+    while TEMP_DIRS:
+        TEMP_DIRS.pop().cleanup()
+
+
+def alternating(*tile_types):
+    """Бесконечно чередует типы тайлов, чтобы каждая правка меняла карту"""
+    while True:
+        yield from tile_types
+
+
+def register_brush_cases():
+    for radius in (1, 4, 16, 32):
+        def setup(radius=radius):
+            game_map = Map(256, 256)
+            tiles = alternating('sand', 'water')
+            return lambda: game_map.set_tiles_area(128, 128, radius, next(tiles))
+        case(f"map.set_tiles_area.r{radius}")(setup)
+
+
+def maze_map(size):
+    """Худший случай для заливки: змейка из вертикальных стен с проходами по очереди сверху и снизу"""
+    game_map = Map(size, size)
+    for x in range(1, size, 2):
+        game_map.set_rect(x, 0, 1, size, 'forest')
+        gap_y = size - 1 if x % 4 == 1 else 0
+        game_map.set_tile(x, gap_y, 'grass')
+    return game_map
+
+
+@case("map.fill_area.open256")
+def fill_open():
+    game_map = Map(256, 256)
+    state = {'tile': 'grass'}
+
+    def run():
+        replacement = 'sand' if state['tile'] == 'grass' else 'grass'
+        game_map.fill_area(0, 0, state['tile'], replacement)
+        state['tile'] = replacement
+    return run
+
+
+@case("map.fill_area.maze256")
+def fill_maze():
+    game_map = maze_map(256)
+    state = {'tile': 'grass'}
+
+    def run():
+        replacement = 'sand' if state['tile'] == 'grass' else 'grass'
+        game_map.fill_area(0, 0, state['tile'], replacement)
+        state['tile'] = replacement
+    return run
+
+
+def register_grid_cases():
+    for style_index, style in enumerate(Map(1, 1).grid_styles):
+        def setup(style_index=style_index):
+            game_map = Map(256, 256)
+            game_map.grid_style_index = style_index
+            surface = pygame.display.get_surface()
+            offset = alternating(0, 7)
+            return lambda: game_map.draw_grid(surface, next(offset), next(offset))
+        case(f"map.draw_grid.{style}")(setup)
+
+
+def editor_scene(size):
+    """Сцена редактора с новой картой заданного размера"""
+    from game import Game
+    game = Game()
+    game.autosave_dir = None  # Без журнала автосохранения в рабочей папке
+    game.editor_params = {"size": size, "terrain": "grass"}
+    game.change_scene("map_editor")
+    return game, game.current_scene
+
+
+def register_editor_cases():
+    for size in MAP_SIZE_PRESETS:
+        def setup(size=size):
+            game, scene = editor_scene(size)
+            scene.render(game.screen)  # Прогрев кэшей
+            return lambda: scene.render(game.screen)
+        case(f"editor.render.{size}")(setup)
+
+    @case("editor.render.scroll256")
+    def render_scroll():
+        game, scene = editor_scene(256)
+        offsets = alternating(*range(0, 640, 16))
+
+        def run():
+            scene.map.camera_x = next(offsets)
+            scene.render(game.screen)
+        return run
+
+
+def register_io_cases():
+    for size in (64, 256):
+        def setup_json(size=size):
+            game_map = maze_map(size)
+            path = temp_path("map.json")
+
+            def run():
+                # Старый формат редактора (для сравнения с .smap)
+                with open(path, 'w') as f:
+                    json.dump({'size': game_map.width, 'tiles': game_map.tiles,
+                               'default_tile': game_map.default_tile}, f, indent=4)
+                load_json_map(path)
+            return run
+        case(f"io.json_roundtrip.{size}")(setup_json)
+
+        def setup_smap(size=size):
+            game_map = maze_map(size)
+            path = temp_path("map.smap")
+
+            def run():
+                save_map_file(game_map, path)
+                load_map_file(path)
+            return run
+        case(f"io.smap_roundtrip.{size}")(setup_smap)
+
+    @case("io.smap_open.4096")
+    def open_large():
+        # Ленивое открытие читает только заголовок и видимые чанки
+        game_map = Map(4096, 4096)
+        for x in range(0, 4096, 64):
+            game_map.set_tiles_area(x, x, 16, 'water')
+        path = temp_path("map.smap")
+        save_map_file(game_map, path)
+        return lambda: open_map_file(path).get_tile(2048, 2048)
+
+
+register_brush_cases()
+register_grid_cases()
+register_editor_cases()
+register_io_cases()
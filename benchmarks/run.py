@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+# Бенчмарки работают без окна
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+from benchmarks.cases import CASES, cleanup
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+# Минимальное время одного замера: вызов повторяется, пока не наберется столько
+MIN_MEASURE_TIME = 0.05
+
+
+def time_calls(run, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        run()
+    return time.perf_counter() - start
+
+
+def measure(run, repeat):
+    """Замеряет run: число вызовов подбирается как в timeit.autorange.
+
+    Возвращает словарь с лучшим и медианным временем одного вызова в мс.
+    """
+    run()  # Прогрев
+    number = 1
+    while time_calls(run, number) < MIN_MEASURE_TIME:
+        number *= 2
+
+    per_call = [time_calls(run, number) / number * 1000.0 for _ in range(repeat)]
+    return {
+        "best_ms": min(per_call),
+        "median_ms": statistics.median(per_call),
+        "number": number,
+        "repeat": repeat
+    }
+
+
+def run_cases(names, repeat):
+    results = {}
+    for name in names:
+        try:
+            run = CASES[name]()
+            results[name] = measure(run, repeat)
+        finally:
+            cleanup()
+        print(f"{name:<32}{results[name]['best_ms']:>10.3f} мс", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Сравнивает лучшее время с базовым, возвращает список регрессий"""
+    regressions = []
+    print(f"\n{'бенчмарк':<32}{'база, мс':>10}{'сейчас, мс':>12}{'изм.':>9}", file=sys.stderr)
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<32}{'-':>10}{result['best_ms']:>12.3f}{'новый':>9}", file=sys.stderr)
+            continue
+        change = result["best_ms"] / base["best_ms"] - 1.0
+        mark = " !" if change > threshold else ""
+        print(f"{name:<32}{base['best_ms']:>10.3f}{result['best_ms']:>12.3f}{change:>+8.0%}{mark}",
+              file=sys.stderr)
+        if change > threshold:
+            regressions.append((name, change))
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Бенчмарки карты и редактора Selectown")
+    parser.add_argument("--output", metavar="FILE", help="записать результаты в JSON-файл (иначе в stdout)")
+    parser.add_argument("--baseline", metavar="FILE", default=DEFAULT_BASELINE,
+                        help="файл базовых результатов для сравнения")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="сохранить результаты как базовые вместо сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="допустимое замедление относительно базы (0.2 = 20%%)")
+    parser.add_argument("--repeat", type=int, default=5, help="число замеров каждого бенчмарка")
+    parser.add_argument("--filter", metavar="TEXT", help="запускать только бенчмарки, в имени которых есть TEXT")
+    parser.add_argument("--list", action="store_true", help="показать список бенчмарков")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    names = [name for name in CASES if not args.filter or args.filter in name]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    pygame.init()
+    pygame.display.set_mode((1280, 720))
+    results = run_cases(names, args.repeat)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "results": results
+    }
+    text = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            f.write(text)
+        print(f"Базовые результаты сохранены: {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"Базовых результатов нет ({args.baseline}), сравнение пропущено", file=sys.stderr)
+        return 0
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\nРегрессии выше {args.threshold:.0%}: " +
+              ", ".join(f"{name} ({change:+.0%})" for name, change in regressions), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,4 @@
+from collections import deque
 import pygame
 from scenes.main_menu import MainMenuScene
 from scenes.map_select import MapSelectScene
@@ -6,33 +7,84 @@ from scenes.game import GameScene
 from scenes.map_editor import MapEditorScene
 from scenes.map_editor_menu import MapEditorMenuScene
 from scenes.map_editor_params import MapEditorParamsScene
+from ui.profiler_overlay import ProfilerOverlay
+from utils.input import InputLayer
+from utils.profiler import profiler
 from utils.settings import load_settings, save_settings
+from utils.timestep import FixedTimestep
+from world.journal import AUTOSAVE_DIR
+
+# Сколько ждать события на неизменном экране, прежде чем проверить сцену снова
+IDLE_TIMEOUT_MS = 500
+# События окна, после которых экран выводится целиком
+EXPOSE_EVENTS = (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED,
+                 pygame.WINDOWSIZECHANGED)
+
+# Реестр сцен: имя -> фабрика (класс сцены). Сцена создается при первом входе
+SCENE_FACTORIES = {
+    "main_menu": MainMenuScene,
+    "map_select": MapSelectScene,
+    "settings": SettingsScene,
+    "game": GameScene,
+    "map_editor": MapEditorScene,
+    "map_editor_menu": MapEditorMenuScene,
+    "map_editor_params": MapEditorParamsScene,
+}
 
 
 class Game:
     def __init__(self):
         self.screen = None
         self.clock = pygame.time.Clock()
+        self.input = InputLayer()
         self.running = True
-        self.scenes = {}
+        self.scenes = {}  # Уже созданные сцены
+        self.preload_queue = deque()  # Сцены, которые создаются в простое
         self.current_scene = None
         self.current_scene_name = None
         self.settings = load_settings()
         self.editor_params = None
+        self.timestep = FixedTimestep(self.settings.get("tick_rate", 60))
+        self.max_fps = self.settings.get("max_fps", 60)
+        self.interpolation = 0.0  # Доля шага симуляции для плавной отрисовки
+        self.idle = False  # Прошлый кадр ничего не изменил на экране
+        self.waited = False  # Прошлый кадр ждал событий
+        self.profiler_overlay = ProfilerOverlay()
+        self.scene_spans = ("events", "update", "render")  # Имена участков текущей сцены
+        self.recorder = None  # utils.replay.Recorder при записи ввода
+        self.sync_jobs = False  # Фоновые задачи завершаются в том же кадре (запись и воспроизведение ввода)
+        self.autosave_dir = AUTOSAVE_DIR  # Журналы правок редактора (world.journal); None - без них
+        self.full_flip = True  # Следующий кадр выводится целиком
         self.init_screen()
         self.init_scenes()
 
     def init_scenes(self):
-        """Создаем или пересоздаем все сцены"""
-        self.scenes = {
-            "main_menu": MainMenuScene(self),
-            "map_select": MapSelectScene(self),
-            "settings": SettingsScene(self),
-            "game": GameScene(self),
-            "map_editor": MapEditorScene(self),
-            "map_editor_menu": MapEditorMenuScene(self),
-            "map_editor_params": MapEditorParamsScene(self),
-        }
+        """Сбрасывает созданные сцены: каждая будет создана заново при первом входе"""
+        self.scenes = {}
+        self.preload_queue.clear()
+
+    def get_scene(self, scene_name):
+        """Возвращает сцену, создавая ее при первом обращении"""
+        scene = self.scenes.get(scene_name)
+        if scene is None:
+            with profiler.span(f"scene.create.{scene_name}"):
+                scene = self.scenes[scene_name] = SCENE_FACTORIES[scene_name](self)
+        return scene
+
+    def preload(self, scene_names):
+        """Ставит сцены в очередь на создание в свободное время (по одной за кадр простоя)"""
+        for scene_name in scene_names:
+            if scene_name not in self.scenes and scene_name not in self.preload_queue:
+                self.preload_queue.append(scene_name)
+
+    def preload_next(self):
+        """Создает следующую сцену из очереди, возвращает False, если очередь пуста"""
+        while self.preload_queue:
+            scene_name = self.preload_queue.popleft()
+            if scene_name not in self.scenes:
+                self.get_scene(scene_name)
+                return True
+        return False
 
     def load_settings(self):
         return load_settings()
@@ -45,29 +97,116 @@ class Game:
         flags = pygame.FULLSCREEN if self.settings["fullscreen"] else 0
         self.screen = pygame.display.set_mode((width, height), flags)
         pygame.display.set_caption("Selectown")
+        self.full_flip = True
 
     def run(self):
+        # Первый кадр зависит только от главного меню, остальное - в простое
         self.change_scene("main_menu")
+        self.preload(SCENE_FACTORIES)
 
         while self.running:
-            dt = self.clock.tick(60) / 1000.0
-            events = pygame.event.get()
-
-            for event in events:
-                if event.type == pygame.QUIT:
-                    self.running = False
+            frame_time = self.clock.tick(self.max_fps) / 1000.0
+            # Пока игра ждала событий, время симуляции не накапливается
+            if self.waited:
+                frame_time = 0.0
+                self.timestep.reset()
+            elif profiler.enabled:
+                profiler.record("frame", frame_time)
+
+            raw_events = self.poll_events()
+            with profiler.span("game.frame"):
+                self.step(raw_events, frame_time)
+
+        # Сцена завершается и при выходе из игры (например, дописывает сохранение)
+        if self.current_scene:
+            self.current_scene.on_exit()
 
-            if self.current_scene:
+    def step(self, raw_events, frame_time, now=None):
+        """Один кадр: события, шаги симуляции, отрисовка и вывод на экран.
+
+        now - время кадра в мс (при воспроизведении записи берется из нее).
+        """
+        # Движения мыши за кадр склеиваются в одно событие с путем
+        events = self.input.process(raw_events, now)
+        if self.recorder is not None:
+            self.recorder.record(raw_events, self.input.time, frame_time)
+
+        for event in events:
+            if event.type == pygame.QUIT:
+                self.running = False
+            elif event.type in EXPOSE_EVENTS:
+                self.full_flip = True
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.toggle_profiler()
+
+        events_span, update_span, render_span = self.scene_spans
+        dirty_rects = None
+        if self.current_scene:
+            with profiler.span(events_span):
                 self.current_scene.handle_events(events)
-                self.current_scene.update(dt)
-                self.current_scene.render(self.screen)
-
+            # Симуляция идет фиксированными шагами независимо от частоты кадров
+            for _ in range(self.timestep.advance(frame_time)):
+                with profiler.span(update_span):
+                    self.current_scene.update(self.timestep.step)
+            self.interpolation = self.timestep.alpha
+            with profiler.span(render_span):
+                dirty_rects = self.current_scene.render(self.screen)
+
+        if profiler.enabled:
+            overlay_rect = self.profiler_overlay.draw(self.screen)
+            if dirty_rects is not None:
+                dirty_rects = dirty_rects + [overlay_rect]
+
+        with profiler.span("display"):
+            self.present(dirty_rects)
+
+    def toggle_profiler(self):
+        """Включает/выключает профилировщик кадра и его оверлей (F3)"""
+        enabled = profiler.toggle()
+        self.profiler_overlay.reset()
+        print(f"Профилировщик {'включен' if enabled else 'выключен'}")
+        # Сцена перерисовывается целиком, чтобы убрать следы оверлея
+        self.request_redraw()
+
+    def poll_events(self):
+        """Забирает события кадра; на неизменном экране блокируется до события"""
+        # Свободный кадр тратится на создание сцены из очереди вместо ожидания
+        if self.idle and self.preload_next():
+            self.waited = False
+            return pygame.event.get()
+
+        self.waited = self.idle
+        if not self.idle:
+            return pygame.event.get()
+
+        event = pygame.event.wait(IDLE_TIMEOUT_MS)
+        if event.type == pygame.NOEVENT:
+            return []
+        return [event] + pygame.event.get()
+
+    def present(self, dirty_rects):
+        """Выводит кадр на экран.
+
+        dirty_rects - то, что вернул render сцены: None - экран целиком,
+        список прямоугольников - только эти области, пустой список -
+        экран не изменился, и игра ждет событий вместо отрисовки.
+        """
+        if dirty_rects is None or self.full_flip:
             pygame.display.flip()
+            self.full_flip = False
+        elif dirty_rects:
+            pygame.display.update(dirty_rects)
+
+        self.idle = dirty_rects is not None and not dirty_rects
 
     def change_scene(self, scene_name):
         if self.current_scene:
             self.current_scene.on_exit()
-        self.current_scene = self.scenes[scene_name]
+        self.current_scene = self.get_scene(scene_name)
+        self.scene_spans = tuple(f"{scene_name}.{stage}" for stage in ("events", "update", "render"))
+        self.timestep.reset()
+        self.full_flip = True
+        self.idle = False
         self.current_scene_name = scene_name
         self.current_scene.on_enter()
 
@@ -75,12 +214,19 @@ class Game:
         self.running = False
 
     def reload_scenes(self):
-        """Пересоздает все сцены с новыми настройками"""
-        # Сохраняем имя текущей сцены
-        current_scene_name = self.current_scene_name
-
-        # Пересоздаем сцены
-        self.init_scenes()
-
-        # Восстанавливаем текущую сцену по имени
-        self.change_scene(current_scene_name)
\ No newline at end of file
+        """Перестраивает интерфейс созданных сцен под новые настройки экрана.
+
+        Сцены не пересоздаются: каждая заново раскладывает свои элементы
+        в init_ui, а состояние (например, открытая карта) сохраняется.
+        """
+        for scene in self.scenes.values():
+            scene.init_ui()
+
+        self.request_redraw()
+
+    def request_redraw(self):
+        """Просит текущую сцену перерисоваться и вывести экран целиком"""
+        if self.current_scene and hasattr(self.current_scene, 'redraw'):
+            self.current_scene.redraw = True
+        self.full_flip = True
+        self.idle = False
\ No newline at end of file
@@ -1,11 +1,67 @@
+import argparse
+import json
+import os
 import pygame
 from game import Game
+from utils.profiler import profiler
+from utils.replay import Recorder, frame_time_report, replay
+from utils.tracing import DEFAULT_CAPACITY, Tracer
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Selectown")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="записать трассировку в JSON (Chrome trace / Perfetto)")
+    parser.add_argument("--trace-csv", metavar="FILE",
+                        help="записать сводку трассировки по участкам в CSV")
+    parser.add_argument("--trace-buffer", metavar="N", type=int, default=DEFAULT_CAPACITY,
+                        help=f"сколько последних участков хранить (по умолчанию {DEFAULT_CAPACITY})")
+    parser.add_argument("--record", metavar="FILE",
+                        help="записать ввод (мышь, клавиатура, колесо) в файл для воспроизведения")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="воспроизвести запись ввода без окна и вывести распределение времени кадров")
+    parser.add_argument("--replay-dt", metavar="SEC", type=float,
+                        help="шаг кадра при воспроизведении (по умолчанию шаг симуляции)")
+    parser.add_argument("--replay-report", metavar="FILE",
+                        help="сохранить сводку воспроизведения в JSON")
+    return parser.parse_args()
 
 
 def main():
+    args = parse_args()
+
+    tracer = None
+    if args.trace or args.trace_csv:
+        tracer = Tracer(args.trace_buffer)
+        profiler.set_tracer(tracer)
+
+    if args.replay:
+        # Воспроизведение идет без окна
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
     pygame.init()
     game = Game()
-    game.run()
+    if args.record:
+        game.recorder = Recorder(args.record, game)
+    try:
+        if args.replay:
+            report = frame_time_report(replay(game, args.replay, args.replay_dt))
+            print(json.dumps(report, indent=4))
+            if args.replay_report:
+                with open(args.replay_report, "w") as f:
+                    json.dump(report, f, indent=4)
+        else:
+            game.run()
+    finally:
+        if game.recorder is not None:
+            game.recorder.close()
+        if tracer is not None:
+            profiler.set_tracer(None)
+            if args.trace:
+                tracer.save_json(args.trace)
+            if args.trace_csv:
+                tracer.save_csv(args.trace_csv)
 
 
 if __name__ == "__main__":
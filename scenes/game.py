@@ -1,12 +1,15 @@
-import pygame
 from ui.button import Button
+from ui.layer import UILayer
+from ui.text import render_text
 from scenes.main_menu import MainMenuScene
+from scenes.ui_scene import UIScene
 
 
-class GameScene:
+class GameScene(UIScene):
     def __init__(self, game):
         self.game = game
         self.buttons = []
+        self.redraw = True  # Следующий кадр рисуется целиком
         self.init_ui()
 
     def init_ui(self):
@@ -20,9 +23,11 @@ class GameScene:
                 lambda: self.game.change_scene("main_menu")
             )
         ]
+        self.ui = UILayer(self.buttons)
 
     def on_enter(self):
         print("Вход в игровую сцену")
+        self.redraw = True
         self.init_ui()
 
     def on_exit(self):
@@ -30,25 +35,23 @@ class GameScene:
 
     def handle_events(self, events):
         for event in events:
-            for button in self.buttons:
-                button.handle_event(event)
+            self.ui.dispatch(event)
 
     def update(self, dt):
+        # dt - фиксированный шаг симуляции (Game.timestep.step), для плавной
+        # отрисовки между шагами используется self.game.interpolation
         pass
 
-    def render(self, surface):
+    def draw_scene(self, surface):
         surface.fill((30, 40, 50))
 
         # Заглушка
-        font = pygame.font.Font(None, 64)
-        text = font.render("Игровая сцена", True, (200, 220, 255))
+        text = render_text("Игровая сцена", 64, (200, 220, 255))
         text_rect = text.get_rect(center=(surface.get_width() // 2, surface.get_height() // 2))
         surface.blit(text, text_rect)
 
-        sub_font = pygame.font.Font(None, 32)
-        sub_text = sub_font.render("(в разработке)", True, (180, 200, 220))
+        sub_text = render_text("(в разработке)", 32, (180, 200, 220))
         sub_rect = sub_text.get_rect(center=(surface.get_width() // 2, surface.get_height() // 2 + 50))
         surface.blit(sub_text, sub_rect)
 
-        for button in self.buttons:
-            button.draw(surface)
+        self.ui.blit(surface)
@@ -1,28 +1,31 @@
 import pygame
 from ui.button import Button
+from ui.layer import UILayer
+from ui.text import render_text
+from scenes.ui_scene import UIScene
 
 
-class MainMenuScene:
+class MainMenuScene(UIScene):
     def __init__(self, game):
         self.game = game
         self.buttons = []
-        self.background = pygame.Surface(game.screen.get_size())
-        self.background.fill((40, 45, 60))
-
-        # Создание градиента
-        for y in range(self.background.get_height()):
-            color_val = 60 - int(y / self.background.get_height() * 20)
-            pygame.draw.line(
-                self.background,
-                (40, color_val, 80),
-                (0, y),
-                (self.background.get_width(), y)
-            )
-
+        self.redraw = True  # Следующий кадр рисуется целиком
+        self.background = None
         self.init_ui()
 
+    def build_background(self, size):
+        """Вертикальный градиент: столбец в пиксель шириной растягивается на экран"""
+        width, height = size
+        column = pygame.Surface((1, height))
+        for y in range(height):
+            color_val = 60 - int(y / height * 20)
+            column.set_at((0, y), (40, color_val, 80))
+        return pygame.transform.scale(column, size)
+
     def init_ui(self):
         screen_width, screen_height = self.game.screen.get_size()
+        if self.background is None or self.background.get_size() != (screen_width, screen_height):
+            self.background = self.build_background((screen_width, screen_height))
         button_width, button_height = 300, 60
         button_x = (screen_width - button_width) // 2
 
@@ -58,9 +61,11 @@ class MainMenuScene:
                 self.game.quit
             ),
         ]
+        self.ui = UILayer(self.buttons)
 
     def on_enter(self):
         print("Вход в главное меню")
+        self.redraw = True
         self.init_ui()
 
     def on_exit(self):
@@ -68,20 +73,17 @@ class MainMenuScene:
 
     def handle_events(self, events):
         for event in events:
-            for button in self.buttons:
-                button.handle_event(event)
+            self.ui.dispatch(event)
 
     def update(self, dt):
         pass
 
-    def render(self, surface):
+    def draw_scene(self, surface):
         surface.blit(self.background, (0, 0))
 
         # Заголовок игры
-        title_font = pygame.font.Font(None, 80)
-        title = title_font.render("Selectown", True, (220, 240, 255))
+        title = render_text("Selectown", 80, (220, 240, 255))
         title_rect = title.get_rect(center=(surface.get_width() // 2, surface.get_height() * 0.2))
         surface.blit(title, title_rect)
 
-        for button in self.buttons:
-            button.draw(surface)
+        self.ui.blit(surface)
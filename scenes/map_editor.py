@@ -1,10 +1,29 @@
+from collections import OrderedDict
 import pygame
-import json
 import os
 import re
 from ui.button import Button
+from ui.layer import UILayer
+from ui.overlay import dim_overlay
 from ui.slider import Slider
+from ui.swatch import Swatch
+from ui.text import render_text
+from world.brush import get_mask
+from world.jobs import LoadJob, SaveJob
+from world.journal import (EditJournal, JournalError, crashed_sessions, discard_session, file_base,
+                           new_map_base, recover_map)
 from world.map import Map
+from world.mapfile import MAP_EXTENSION, list_map_files, read_map_info
+from world.renderer import MapRenderer
+from world.stroke import Stroke
+from world.tiles import TILE_TYPES
+
+# Скорость прокрутки камеры у краев экрана, пикселей в секунду
+EDGE_SCROLL_SPEED = 300
+# Сколько мс показывается результат сохранения или загрузки
+STATUS_TIME = 3000
+# Предел кэша отпечатков кисти в пикселях (RGBA - 4 байта на пиксель)
+BRUSH_PREVIEW_PIXELS = 16 * 1024 * 1024
 
 
 class MapEditorScene:
@@ -13,20 +32,20 @@ class MapEditorScene:
         self.buttons = []
         self.tile_buttons = []
         self.tool_buttons = []
-        self.tile_types = {
-            'grass': (50, 200, 50),
-            'sand': (230, 220, 100),
-            'earth': (150, 100, 50),
-            'forest': (0, 150, 0),
-            'water': (0, 100, 200)
-        }
+        self.tile_types = dict(TILE_TYPES)
+        self.map_renderer = MapRenderer(self.tile_types)
+        self.brush_previews = OrderedDict()  # (форма, размер, тайл, инструмент) -> поверхность
+        self.brush_preview_pixels = 0
         self.default_tile = 'grass'
         self.current_tile_type = 'grass'
         self.current_tool = 'brush'
         self.dragging = False
         self.drag_start_x, self.drag_start_y = 0, 0
         self.map = None
+        self.stroke = None
         self.show_load_dialog = None
+        self.camera_step = (0, 0)  # Сдвиг камеры за последний шаг симуляции (для интерполяции)
+        self.ui_interaction = False  # Прошлые события кадра попали в UI
 
         self.save_dialog_active = False
         self.filename_input = ""
@@ -36,6 +55,13 @@ class MapEditorScene:
         self.input_active = False
         self.last_blink_time = 0
         self.cursor_visible = True
+        self.save_job = None  # Идущее фоновое сохранение (world.jobs.SaveJob)
+        self.status_message = ""
+        self.status_color = (150, 230, 150)
+        self.status_time = 0
+
+        self.load_job = None  # Идущая фоновая загрузка (world.jobs.LoadJob)
+        self.journal = None  # Журнал правок для восстановления после сбоя (world.journal)
 
         self.load_dialog_active = False
         self.map_files = []
@@ -59,36 +85,20 @@ class MapEditorScene:
 
         self.tile_buttons = []
         for i, (tile_name, tile_color) in enumerate(self.tile_types.items()):
-            self.tile_buttons.append({
-                'rect': pygame.Rect(start_x + i * (tile_btn_size + spacing), start_y, tile_btn_size, tile_btn_size),
-                'name': tile_name,
-                'color': tile_color
-            })
+            self.tile_buttons.append(Swatch(
+                start_x + i * (tile_btn_size + spacing), start_y, tile_btn_size, tile_btn_size,
+                tile_name, tile_color, action=self.select_tile_type
+            ))
 
         # Кнопки инструментов
+        tools_x = start_x + len(self.tile_types) * (tile_btn_size + spacing)
         self.tool_buttons = [
-            {
-                'rect': pygame.Rect(start_x + len(self.tile_types) * (tile_btn_size + spacing) + 20, start_y,
-                                    tile_btn_size, tile_btn_size),
-                'name': 'brush',
-                'color': (200, 200, 200),
-                'label': 'Кисть'
-            },
-            {
-                'rect': pygame.Rect(start_x + len(self.tile_types) * (tile_btn_size + spacing) + tile_btn_size + 30,
-                                    start_y, tile_btn_size, tile_btn_size),
-                'name': 'eraser',
-                'color': (150, 150, 150),
-                'label': 'Ластик'
-            },
-            {
-                'rect': pygame.Rect(
-                    start_x + len(self.tile_types) * (tile_btn_size + spacing) + 2 * (tile_btn_size + 10), start_y,
-                    tile_btn_size, tile_btn_size),
-                'name': 'fill',
-                'color': (100, 100, 200),
-                'label': 'Заливка'
-            }
+            Swatch(tools_x + 20, start_y, tile_btn_size, tile_btn_size,
+                   'brush', (200, 200, 200), 'Кисть', self.select_tool),
+            Swatch(tools_x + tile_btn_size + 30, start_y, tile_btn_size, tile_btn_size,
+                   'eraser', (150, 150, 150), 'Ластик', self.select_tool),
+            Swatch(tools_x + 2 * (tile_btn_size + 10), start_y, tile_btn_size, tile_btn_size,
+                   'fill', (100, 100, 200), 'Заливка', self.select_tool)
         ]
 
         # Кнопки управления
@@ -121,7 +131,7 @@ class MapEditorScene:
             height=20,
             min_val=1,
             max_val=32,
-            initial_val=1,
+            initial_val=self.map.brush_size if self.map else 1,
             label="Размер кисти"
         )
 
@@ -129,11 +139,19 @@ class MapEditorScene:
         self.grid_button = Button(
             screen_width - 210, 160,
             200, 40,
-            "Сетка: ВКЛ",
+            self.grid_button_text(),
             self.toggle_grid
         )
         self.buttons.append(self.grid_button)
 
+        # Слой интерфейса в порядке наложения
+        self.ui = UILayer(self.buttons + self.tile_buttons + self.tool_buttons + [self.brush_slider])
+
+        # Кнопка отмены на экране загрузки
+        self.loading_ui = UILayer([
+            Button(screen_width // 2 - 100, screen_height // 2 + 80, 200, 40, "Отмена", self.cancel_loading)
+        ])
+
         # Инициализация UI для диалогов
         self.init_save_dialog_ui()
         self.init_load_dialog_ui()
@@ -145,7 +163,11 @@ class MapEditorScene:
         if hasattr(self.game, 'editor_params'):
             # Если есть файл для загрузки
             if 'load_file' in self.game.editor_params:
+                self.map = None  # При отмене загрузки возвращаемся в меню
                 self.load_map(self.game.editor_params['load_file'])
+            # Или восстановление после сбоя
+            elif 'recover' in self.game.editor_params:
+                self.restore_map()
             # Или параметры создания новой карты
             elif 'size' in self.game.editor_params:
                 size = self.game.editor_params.get('size', 64)
@@ -160,12 +182,76 @@ class MapEditorScene:
     def create_map(self, size, terrain='grass'):
         """Создает новую карту заданного размера и типа"""
         self.map = Map(size, size, terrain)
+        self.stroke = None
+        self.start_journal(new_map_base(self.map))
         print(f"Создана новая карта {size}x{size} с типом поверхности: {terrain}")
 
+    def restore_map(self):
+        """Восстанавливает карту из журнала автосохранения после сбоя"""
+        sessions = crashed_sessions(self.game.autosave_dir)
+        try:
+            if not sessions:
+                raise JournalError("нет журнала для восстановления")
+            game_map = recover_map(sessions[-1])
+        except (OSError, ValueError) as e:
+            print(f"Ошибка восстановления карты: {e}")
+            self.show_status(f"Ошибка восстановления: {e}", error=True)
+            self.create_map(64, 'grass')
+            return
+        self.map = game_map
+        self.stroke = None
+        # Основой нового журнала становится снимок восстановленной карты;
+        # журнал сбоя больше не нужен, только когда новый уже записан
+        self.start_journal(None)
+        if self.journal is not None:
+            discard_session(sessions[-1])
+        print("Карта восстановлена из автосохранения")
+
+    def start_journal(self, base):
+        """Начинает журнал правок текущей карты (прежний журнал закрывается).
+
+        Без game.autosave_dir (бенчмарки, воспроизведение записи) журнал не ведется.
+        """
+        self.stop_journal()
+        if self.game.autosave_dir is None:
+            return
+        try:
+            self.journal = EditJournal(self.map, base, self.game.autosave_dir)
+        except OSError as e:
+            print(f"Автосохранение недоступно: {e}")
+
+    def stop_journal(self):
+        """Нормальное завершение журнала: его файлы удаляются"""
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
     def on_exit(self):
+        if self.load_job is not None:
+            self.cancel_loading()
+        # Начатое сохранение нужно довести до конца, иначе файл не появится;
+        # замена файла ждет сжатия журнала
+        if self.save_job is not None:
+            if self.journal is not None:
+                self.journal.wait()
+            self.save_job.wait()
+            self.poll_save()
+        self.stop_journal()
         print("Выход из редактора карт")
 
     def handle_events(self, events):
+        self.ui_interaction = False
+
+        # Во время загрузки доступна только отмена
+        if self.load_job is not None:
+            for event in events:
+                self.loading_ui.dispatch(event)
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                    self.cancel_loading()
+                if self.load_job is None:
+                    break
+            return
+
         if self.map is None:
             return
 
@@ -175,13 +261,12 @@ class MapEditorScene:
         for event in events:
             # Если активен диалог сохранения - обрабатываем только его
             if self.save_dialog_active:
-                for button in self.save_dialog_buttons:
-                    button.handle_event(event)
+                self.save_dialog_ui.dispatch(event)
 
                 if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                     if self.input_rect.collidepoint(event.pos):
                         self.input_active = True
-                        self.last_blink_time = pygame.time.get_ticks()
+                        self.last_blink_time = event.time
                         self.cursor_visible = True
                     else:
                         self.input_active = False
@@ -204,8 +289,7 @@ class MapEditorScene:
 
             # Если активен диалог загрузки - обрабатываем только его
             if self.load_dialog_active:
-                for button in self.load_dialog_buttons:
-                    button.handle_event(event)
+                self.load_dialog_ui.dispatch(event)
 
                 # Обработка клика по миниатюрам карт
                 if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
@@ -238,36 +322,13 @@ class MapEditorScene:
 
                 return
 
-            # Обработка UI элементов в первую очередь
-            ui_handled = False
+            # Обработка UI элементов в первую очередь: событие получает
+            # только элемент под курсором или захвативший мышь
+            target = self.ui.dispatch(event)
 
-            # Обработка основных кнопок
-            for button in self.buttons:
-                if button.handle_event(event):
-                    ui_handled = True
-                    ui_interaction = True
-
-            # Обработка слайдера
-            if self.brush_slider.handle_event(event):
-                ui_handled = True
+            # Нажатие на UI и перетаскивание слайдера не доходят до карты
+            if target is not None and (event.type == pygame.MOUSEBUTTONDOWN or self.ui.capture is not None):
                 ui_interaction = True
-
-            # Обработка кнопок выбора тайлов и инструментов
-            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                for btn in self.tile_buttons:
-                    if btn['rect'].collidepoint(event.pos):
-                        self.current_tile_type = btn['name']
-                        ui_handled = True
-                        ui_interaction = True
-
-                for btn in self.tool_buttons:
-                    if btn['rect'].collidepoint(event.pos):
-                        self.current_tool = btn['name']
-                        ui_handled = True
-                        ui_interaction = True
-
-            # Если событие обработано UI, пропускаем обработку карты
-            if ui_handled:
                 continue
 
             # Обработка событий карты
@@ -281,12 +342,14 @@ class MapEditorScene:
                     self.dragging = True
                     self.drag_start_x, self.drag_start_y = event.pos
                 elif event.button == 4:  # Колесо вверх - масштаб+
-                    self.map.zoom_in()
+                    self.map.zoom_in(event.pos)
                 elif event.button == 5:  # Колесо вниз - масштаб-
-                    self.map.zoom_out()
+                    self.map.zoom_out(event.pos)
 
             elif event.type == pygame.MOUSEBUTTONUP:
-                if event.button == 2:
+                if event.button == 1:
+                    self.stroke = None  # Мазок завершен
+                elif event.button == 2:
                     self.dragging = False
 
             elif event.type == pygame.MOUSEMOTION:
@@ -296,47 +359,40 @@ class MapEditorScene:
                     self.map.camera_x -= dx
                     self.map.camera_y -= dy
                     self.drag_start_x, self.drag_start_y = event.pos
-                elif pygame.mouse.get_pressed()[0]:  # ЛКМ зажата
-                    # Проверка, что курсор не на UI
-                    if not self.is_point_on_ui(event.pos):
-                        if self.current_tool == 'brush':
-                            self.handle_paint(event.pos)
-                        elif self.current_tool == 'eraser':
-                            self.handle_erase(event.pos)
+                elif event.buttons[0]:  # ЛКМ зажата
+                    # Все позиции курсора за кадр, склеенные слоем ввода
+                    for pos in getattr(event, 'samples', [event.pos]):
+                        # Проверка, что курсор не на UI
+                        if not self.is_point_on_ui(pos):
+                            if self.current_tool == 'brush':
+                                self.handle_paint(pos)
+                            elif self.current_tool == 'eraser':
+                                self.handle_erase(pos)
+                        else:
+                            # Не соединяем мазок линией через элементы интерфейса
+                            self.stroke = None
 
             # Обработка клавиатуры
             if event.type == pygame.KEYDOWN:
                 # Shift+G - смена цвета сетки
-                if event.key == pygame.K_g and pygame.key.get_mods() & pygame.KMOD_SHIFT:
+                if event.key == pygame.K_g and event.mod & pygame.KMOD_SHIFT:
                     self.map.toggle_grid_color()
 
                 # Ctrl+G - смена стиля сетки
-                elif event.key == pygame.K_g and pygame.key.get_mods() & pygame.KMOD_CTRL:
+                elif event.key == pygame.K_g and event.mod & pygame.KMOD_CTRL:
                     self.map.toggle_grid_style()
 
+                # Клавиша B - смена формы кисти
+                elif event.key == pygame.K_b:
+                    self.map.toggle_brush_shape()
+                    print(f"Форма кисти: {self.map.brush_shape}")
+
                 # Клавиша G - переключение сетки
                 elif event.key == pygame.K_g:
                     self.map.show_grid = not self.map.show_grid
-                    self.grid_button.text = f"Сетка: {'ВКЛ' if self.map.show_grid else 'ВЫКЛ'}"
+                    self.grid_button.text = self.grid_button_text()
                     print(f"Сетка {'включена' if self.map.show_grid else 'выключена'}")
 
-            # Обработка краев экрана для плавного перемещения
-            mouse_x, mouse_y = pygame.mouse.get_pos()
-            screen_width, screen_height = self.game.screen.get_size()
-            move_speed = 5
-
-            # Проверка, что курсор не на UI при обработке краёв экрана
-            if not self.is_point_on_ui((mouse_x, mouse_y)):
-                if mouse_x < 20:
-                    self.map.camera_x -= move_speed
-                elif mouse_x > screen_width - 20:
-                    self.map.camera_x += move_speed
-
-                if mouse_y < 20:
-                    self.map.camera_y -= move_speed
-                elif mouse_y > screen_height - 20:
-                    self.map.camera_y += move_speed
-
             # Обработка слайдера (повторно, для обновления значения)
             if hasattr(self, 'map'):
                 self.map.brush_size = int(self.brush_slider.get_value())
@@ -346,37 +402,23 @@ class MapEditorScene:
 
     def is_point_on_ui(self, pos):
         """Проверяет, находится ли точка на любом UI-элементе"""
-        # Проверка основных кнопок
-        for button in self.buttons:
-            if button.rect.collidepoint(pos):
-                return True
+        return self.ui.widget_at(pos) is not None
 
-        # Проверка кнопок выбора тайлов
-        for btn in self.tile_buttons:
-            if btn['rect'].collidepoint(pos):
-                return True
-
-        # Проверка кнопок инструментов
-        for btn in self.tool_buttons:
-            if btn['rect'].collidepoint(pos):
-                return True
+    def select_tile_type(self, tile_type):
+        self.current_tile_type = tile_type
 
-        # Проверка слайдера
-        if self.brush_slider.rect.collidepoint(pos):
-            return True
-
-        return False
+    def select_tool(self, tool):
+        self.current_tool = tool
 
     def handle_mouse_click(self, mouse_pos):
         """Обработка клика мыши в зависимости от выбранного инструмента"""
         # Рассчитываем координаты тайла с учетом камеры
-        tile_x = (mouse_pos[0] + self.map.camera_x) // self.map.tile_size
-        tile_y = (mouse_pos[1] + self.map.camera_y) // self.map.tile_size
+        tile_x, tile_y = self.map.screen_to_tile(mouse_pos)
 
-        if self.current_tool == 'brush':
-            self.map.set_tiles_area(tile_x, tile_y, self.map.brush_size, self.current_tile_type)
-        elif self.current_tool == 'eraser':
-            self.map.set_tiles_area(tile_x, tile_y, self.map.brush_size, self.map.default_tile)
+        if self.current_tool in ('brush', 'eraser'):
+            # Клик начинает новый мазок
+            self.stroke = None
+            self.continue_stroke(mouse_pos)
         elif self.current_tool == 'fill':
             target_tile = self.map.get_tile(tile_x, tile_y)
             if target_tile:
@@ -385,111 +427,154 @@ class MapEditorScene:
     def handle_paint(self, pos):
         """Обработка рисования при зажатой ЛКМ"""
         if self.current_tool == 'brush':
-            tile_x = (pos[0] + self.map.camera_x) // self.map.tile_size
-            tile_y = (pos[1] + self.map.camera_y) // self.map.tile_size
-            self.map.set_tiles_area(tile_x, tile_y, self.map.brush_size, self.current_tile_type)
+            self.continue_stroke(pos)
 
     def handle_erase(self, pos):
         """Обработка стирания при зажатой ЛКМ"""
         if self.current_tool == 'eraser':
-            tile_x = (pos[0] + self.map.camera_x) // self.map.tile_size
-            tile_y = (pos[1] + self.map.camera_y) // self.map.tile_size
-            self.map.set_tiles_area(tile_x, tile_y, self.map.brush_size, self.map.default_tile)
+            self.continue_stroke(pos)
+
+    def continue_stroke(self, pos):
+        """Продлевает текущий мазок кисти/ластика до позиции курсора"""
+        if self.stroke is None:
+            tile_type = self.current_tile_type if self.current_tool == 'brush' else self.map.default_tile
+            mask = get_mask(self.map.brush_shape, self.map.brush_size)
+            self.stroke = Stroke(self.map, tile_type, mask)
+
+        tile_x, tile_y = self.map.screen_to_tile(pos)
+        self.stroke.add_point(tile_x, tile_y)
+
+    def get_brush_preview(self, mask):
+        """Возвращает готовый отпечаток кисти для предпросмотра.
+
+        Поверхность собирается один раз для каждой комбинации
+        (форма, размер кисти, размер тайла, инструмент). Кэш ограничен по
+        числу пикселей и вытесняет давно не использованные отпечатки.
+        """
+        tile_size = self.map.tile_size
+        key = (self.map.brush_shape, self.map.brush_size, tile_size, self.current_tool)
+        preview = self.brush_previews.get(key)
+        if preview is not None:
+            self.brush_previews.move_to_end(key)
+            return preview
+
+        # Полупрозрачный круг на каждую ячейку кисти
+        cell_size = max(1, int(tile_size))
+        color = (100, 200, 255, 100) if self.current_tool == 'brush' else (255, 100, 100, 100)
+        width = int((mask.max_dx - mask.min_dx) * tile_size) + cell_size
+        height = int((mask.max_dy - mask.min_dy) * tile_size) + cell_size
+        preview = pygame.Surface((width, height), pygame.SRCALPHA)
+
+        for x, y in mask.cells():
+            cell_x = int((x - mask.min_dx) * tile_size)
+            cell_y = int((y - mask.min_dy) * tile_size)
+            if cell_size < 2:
+                preview.fill(color, (cell_x, cell_y, cell_size, cell_size))
+            else:
+                pygame.draw.circle(preview, color,
+                                   (cell_x + cell_size // 2, cell_y + cell_size // 2),
+                                   cell_size // 2)
+
+        self.brush_previews[key] = preview
+        self.brush_preview_pixels += width * height
+
+        # Вытесняем самые давние отпечатки, оставляя хотя бы текущий
+        while self.brush_preview_pixels > BRUSH_PREVIEW_PIXELS and len(self.brush_previews) > 1:
+            _, old = self.brush_previews.popitem(last=False)
+            self.brush_preview_pixels -= old.get_width() * old.get_height()
+        return preview
 
     def update(self, dt):
-        pass
+        self.poll_save()
+        self.poll_load()
+        if self.journal is not None:
+            # Пока идет сохранение, журнал не сжимается: оба читают карту в фоне
+            self.journal.update(can_compact=self.save_job is None)
+            if self.game.sync_jobs:
+                self.journal.wait()
+        self.camera_step = (0, 0)
+        if self.map is None or self.save_dialog_active or self.load_dialog_active:
+            return
+
+        # Обработка краев экрана для плавного перемещения (на каждом шаге симуляции)
+        camera_x, camera_y = self.map.camera_x, self.map.camera_y
+        mouse_pos = self.game.input.mouse_pos
+        screen_width, screen_height = self.game.screen.get_size()
+        move_speed = round(EDGE_SCROLL_SPEED * dt)
+
+        # Проверка, что курсор в окне и не на UI при обработке краёв экрана
+        if mouse_pos is not None and not self.is_point_on_ui(mouse_pos):
+            mouse_x, mouse_y = mouse_pos
+            if mouse_x < 20:
+                self.map.camera_x -= move_speed
+            elif mouse_x > screen_width - 20:
+                self.map.camera_x += move_speed
+
+            if mouse_y < 20:
+                self.map.camera_y -= move_speed
+            elif mouse_y > screen_height - 20:
+                self.map.camera_y += move_speed
+        self.camera_step = (self.map.camera_x - camera_x, self.map.camera_y - camera_y)
+
+    def draw_camera(self):
+        """Камера для отрисовки: между двумя последними шагами симуляции.
+
+        Прокрутка у краев идет шагами update, а кадры рисуются со своей
+        частотой, поэтому сдвиг последнего шага доводится по game.interpolation.
+        """
+        lag = 1.0 - self.game.interpolation
+        step_x, step_y = self.camera_step
+        return self.map.camera_x - round(step_x * lag), self.map.camera_y - round(step_y * lag)
 
     def render(self, surface):
-        if self.map is None:
-            surface.fill((0, 0, 0))
-            font = pygame.font.Font(None, 48)
-            text = font.render("Загрузка...", True, (255, 255, 255))
-            text_rect = text.get_rect(center=(surface.get_width() // 2, surface.get_height() // 2))
-            surface.blit(text, text_rect)
+        if self.map is None or self.load_job is not None:
+            self.render_loading(surface)
             return
 
         surface.fill((0, 0, 0))  # Черный фон за картой
 
-        # Рендер карты
-        for y in range(self.map.height):
-            for x in range(self.map.width):
-                tile_type = self.map.get_tile(x, y)
-                color = self.tile_types.get(tile_type, (100, 100, 100))
-
-                # Рассчитываем позицию с учетом камеры и масштаба
-                rect_x = x * self.map.tile_size - self.map.camera_x
-                rect_y = y * self.map.tile_size - self.map.camera_y
-
-                # Рисуем только видимые тайлы
-                if (rect_x + self.map.tile_size > 0 and rect_x < surface.get_width() and
-                        rect_y + self.map.tile_size > 0 and rect_y < surface.get_height()):
-                    pygame.draw.rect(
-                        surface,
-                        color,
-                        (rect_x, rect_y, self.map.tile_size, self.map.tile_size)
-                    )
+        # Рендер карты: только видимые чанки из кэша поверхностей
+        camera_x, camera_y = self.draw_camera()
+        self.map_renderer.draw(surface, self.map, (camera_x, camera_y))
 
         # Предпросмотр области рисования - только если нет взаимодействия с UI
+        mouse_pos = self.game.input.mouse_pos
         if (self.current_tool in ['brush', 'eraser'] and
-                pygame.mouse.get_pressed()[0] and
+                self.game.input.mouse_buttons[0] and
+                mouse_pos is not None and
                 not self.ui_interaction and
-                not self.is_point_on_ui(pygame.mouse.get_pos())):
-
-            mouse_pos = pygame.mouse.get_pos()
-            tile_x = (mouse_pos[0] + self.map.camera_x) // self.map.tile_size
-            tile_y = (mouse_pos[1] + self.map.camera_y) // self.map.tile_size
-
-            # Рисуем полупрозрачный круг для предпросмотра
-            preview_surface = pygame.Surface((self.map.tile_size, self.map.tile_size), pygame.SRCALPHA)
-            color = (100, 200, 255, 100) if self.current_tool == 'brush' else (255, 100, 100, 100)
-            pygame.draw.circle(preview_surface, color,
-                               (self.map.tile_size // 2, self.map.tile_size // 2),
-                               self.map.tile_size // 2)
-
-            for y in range(-self.map.brush_size, self.map.brush_size + 1):
-                for x in range(-self.map.brush_size, self.map.brush_size + 1):
-                    if x * x + y * y <= self.map.brush_size * self.map.brush_size:
-                        screen_x = (tile_x + x) * self.map.tile_size - self.map.camera_x
-                        screen_y = (tile_y + y) * self.map.tile_size - self.map.camera_y
-                        surface.blit(preview_surface, (screen_x, screen_y))
+                not self.is_point_on_ui(mouse_pos)):
 
-        # Рендер сетки поверх тайлов
-        self.map.draw_grid(surface, self.map.camera_x, self.map.camera_y)
+            tile_x, tile_y = self.map.screen_to_tile(mouse_pos)
+            mask = get_mask(self.map.brush_shape, self.map.brush_size)
+            preview = self.get_brush_preview(mask)
 
-        # Рендер UI поверх карты
-        for button in self.buttons:
-            button.draw(surface)
+            # Весь отпечаток кисти выводится одним blit
+            screen_x = (tile_x + mask.min_dx) * self.map.tile_size - camera_x
+            screen_y = (tile_y + mask.min_dy) * self.map.tile_size - camera_y
+            surface.blit(preview, (screen_x, screen_y))
 
-        # Рендер кнопок выбора тайла
-        for btn in self.tile_buttons:
-            pygame.draw.rect(surface, btn['color'], btn['rect'])
-            # Подсветка выбранного типа
-            if btn['name'] == self.current_tile_type:
-                pygame.draw.rect(surface, (255, 255, 0), btn['rect'], 3)
+        # Рендер сетки поверх тайлов
+        self.map.draw_grid(surface, camera_x, camera_y)
 
-        # Рендер кнопок инструментов
+        # Рендер UI поверх карты: перерисовываются только изменившиеся виджеты
+        for btn in self.tile_buttons:
+            btn.selected = btn.name == self.current_tile_type
         for btn in self.tool_buttons:
-            pygame.draw.rect(surface, btn['color'], btn['rect'])
-            # Подсветка выбранного инструмента
-            if btn['name'] == self.current_tool:
-                pygame.draw.rect(surface, (255, 255, 0), btn['rect'], 3)
-
-        # Рендер слайдера
-        self.brush_slider.draw(surface)
+            btn.selected = btn.name == self.current_tool
+        self.ui.draw(surface)
 
         # Отображение информации о текущем инструменте и состоянии сетки
-        font = pygame.font.Font(None, 24)
         grid_status = "ВКЛ" if self.map.show_grid else "ВЫКЛ"
         info_text = f"Инструмент: {self.current_tool} | Размер: {self.map.brush_size} | Тайл: {self.current_tile_type} | Сетка: {grid_status}"
-        text_surf = font.render(info_text, True, (255, 255, 255))
+        text_surf = render_text(info_text, 24, (255, 255, 255))
         surface.blit(text_surf, (20, 20))
+        self.render_status(surface)
 
         # Рендер диалога сохранения поверх всего
         if self.save_dialog_active:
             # Полупрозрачный фон
-            overlay = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 150))
-            surface.blit(overlay, (0, 0))
+            surface.blit(dim_overlay(surface.get_size(), 150), (0, 0))
 
             # Основной прямоугольник диалога
             dialog_width, dialog_height = 500, 200
@@ -501,13 +586,11 @@ class MapEditorScene:
             pygame.draw.rect(surface, (100, 110, 140), dialog_rect, 2, border_radius=10)
 
             # Заголовок
-            title_font = pygame.font.Font(None, 36)
-            title = title_font.render("Сохранить карту", True, (220, 240, 255))
+            title = render_text("Сохранить карту", 36, (220, 240, 255))
             surface.blit(title, (dialog_x + 20, dialog_y + 10))
 
             # Текст подсказки
-            font = pygame.font.Font(None, 28)
-            prompt = font.render("Введите имя файла:", True, (200, 200, 200))
+            prompt = render_text("Введите имя файла:", 28, (200, 200, 200))
             surface.blit(prompt, (dialog_x + 20, dialog_y + 50))
 
             # Поле ввода
@@ -516,12 +599,11 @@ class MapEditorScene:
                              self.input_rect, 2, border_radius=5)
 
             # Введенный текст
-            input_font = pygame.font.Font(None, 32)
-            input_text = input_font.render(self.filename_input, True, (255, 255, 255))
+            input_text = render_text(self.filename_input, 32, (255, 255, 255))
             surface.blit(input_text, (self.input_rect.x + 10, self.input_rect.y + 8))
 
             # Мигающий курсор
-            current_time = pygame.time.get_ticks()
+            current_time = self.game.input.time
             if current_time - self.last_blink_time > 500:  # 500ms
                 self.cursor_visible = not self.cursor_visible
                 self.last_blink_time = current_time
@@ -535,20 +617,16 @@ class MapEditorScene:
 
             # Сообщение об ошибке
             if self.error_message:
-                error_font = pygame.font.Font(None, 26)
-                error_text = error_font.render(self.error_message, True, (255, 100, 100))
+                error_text = render_text(self.error_message, 26, (255, 100, 100))
                 surface.blit(error_text, (dialog_x + 20, dialog_y + 100))
 
             # Кнопки диалога
-            for button in self.save_dialog_buttons:
-                button.draw(surface)
+            self.save_dialog_ui.draw(surface)
 
         # Рендер диалога загрузки поверх всего
         if self.load_dialog_active:
             # Полупрозрачный фон
-            overlay = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 150))
-            surface.blit(overlay, (0, 0))
+            surface.blit(dim_overlay(surface.get_size(), 150), (0, 0))
 
             # Основной прямоугольник диалога
             dialog_width, dialog_height = 700, 500
@@ -560,13 +638,9 @@ class MapEditorScene:
             pygame.draw.rect(surface, (100, 110, 140), dialog_rect, 2, border_radius=10)
 
             # Заголовок
-            title_font = pygame.font.Font(None, 36)
-            title = title_font.render("Загрузить карту", True, (220, 240, 255))
+            title = render_text("Загрузить карту", 36, (220, 240, 255))
             surface.blit(title, (dialog_x + 20, dialog_y + 10))
 
-            # Список доступных карт
-            font = pygame.font.Font(None, 24)
-
             # Отображаем карты с текущим смещением
             visible_files = self.map_files[self.scroll_offset:self.scroll_offset + self.items_per_page]
             visible_thumbnails = self.map_thumbnails[
@@ -588,24 +662,21 @@ class MapEditorScene:
                 surface.blit(thumbnail, (thumb_x, thumb_y))
 
                 # Название файла
-                name_font = pygame.font.Font(None, 20)
-                name_text = name_font.render(os.path.splitext(map_file)[0], True, (200, 200, 200))
+                name_text = render_text(os.path.splitext(map_file)[0], 20, (200, 200, 200))
                 surface.blit(name_text, (thumb_x + 5, thumb_y + 102))
 
             # Информация о прокрутке
             scroll_info = f"Карты {self.scroll_offset + 1}-{min(self.scroll_offset + self.items_per_page, len(self.map_files))} из {len(self.map_files)}"
-            info_text = font.render(scroll_info, True, (200, 200, 200))
+            info_text = render_text(scroll_info, 24, (200, 200, 200))
             surface.blit(info_text, (dialog_x + 120, dialog_y + dialog_height - 50))
 
             # Сообщение об ошибке
             if self.load_error:
-                error_font = pygame.font.Font(None, 26)
-                error_text = error_font.render(self.load_error, True, (255, 100, 100))
+                error_text = render_text(self.load_error, 26, (255, 100, 100))
                 surface.blit(error_text, (dialog_x + 20, dialog_y + 25))
 
             # Кнопки диалога
-            for button in self.load_dialog_buttons:
-                button.draw(surface)
+            self.load_dialog_ui.draw(surface)
 
     def init_save_dialog_ui(self):
         """Инициализирует UI для диалога сохранения"""
@@ -643,6 +714,7 @@ class MapEditorScene:
                 self.cancel_save
             )
         ]
+        self.save_dialog_ui = UILayer(self.save_dialog_buttons)
 
     def save_map(self):
         """Активирует диалог сохранения вместо немедленного сохранения"""
@@ -650,7 +722,7 @@ class MapEditorScene:
         self.filename_input = ""
         self.error_message = ""
         self.input_active = True
-        self.last_blink_time = pygame.time.get_ticks()
+        self.last_blink_time = self.game.input.time
         self.cursor_visible = True
 
     def perform_save(self):
@@ -665,7 +737,11 @@ class MapEditorScene:
             self.error_message = "Недопустимое имя файла!"
             return
 
-        filename = f"{cleaned_name}.json"
+        if self.save_job is not None:
+            self.error_message = "Дождитесь окончания сохранения!"
+            return
+
+        filename = f"{cleaned_name}{MAP_EXTENSION}"
         filepath = os.path.join("maps", filename)
 
         # Проверка, не существует ли файл
@@ -673,19 +749,52 @@ class MapEditorScene:
             self.error_message = "Файл с таким именем уже существует!"
             return
 
-        # Сохранение карты
-        map_info = {
-            'size': self.map.width,
-            'tiles': self.map.tiles,
-            'default_tile': self.map.default_tile
-        }
-
+        # Сжатие и запись идут в фоне, редактирование не прерывается
         os.makedirs("maps", exist_ok=True)
-        with open(filepath, 'w') as f:
-            json.dump(map_info, f, indent=4)
-
-        print(f"Карта сохранена как {filename}")
+        self.save_job = SaveJob(self.map, filepath).start()
+        print(f"Сохранение карты в {filename}...")
         self.save_dialog_active = False
+        if self.game.sync_jobs:
+            if self.journal is not None:
+                self.journal.wait()
+            self.save_job.wait()
+            self.poll_save()
+
+    def poll_save(self):
+        """Завершает фоновое сохранение, когда поток закончил запись"""
+        job = self.save_job
+        # Файл карты заменяется после сжатия журнала: снимок ленивой карты читает исходный файл
+        compacting = self.journal is not None and self.journal.compacting
+        if job is None or not job.poll(can_commit=not compacting):
+            return
+        self.save_job = None
+        filename = os.path.basename(job.path)
+        if job.error is None:
+            print(f"Карта сохранена как {filename}")
+            self.show_status(f"Карта сохранена: {filename}")
+        else:
+            print(f"Ошибка сохранения карты: {job.error}")
+            self.show_status(f"Ошибка сохранения: {job.error}", error=True)
+
+    def show_status(self, message, error=False):
+        """Показывает сообщение под строкой состояния на STATUS_TIME мс"""
+        self.status_message = message
+        self.status_color = (255, 100, 100) if error else (150, 230, 150)
+        self.status_time = self.game.input.time
+
+    def render_status(self, surface):
+        """Прогресс идущего сохранения или результат последнего"""
+        if self.save_job is not None:
+            bar_rect = pygame.Rect(20, 52, 200, 14)
+            pygame.draw.rect(surface, (30, 35, 45), bar_rect)
+            fill_rect = bar_rect.copy()
+            fill_rect.width = round(bar_rect.width * self.save_job.progress)
+            pygame.draw.rect(surface, (100, 150, 200), fill_rect)
+            pygame.draw.rect(surface, (100, 110, 140), bar_rect, 1)
+            text = render_text(f"Сохранение... {self.save_job.progress:.0%}", 20, (220, 220, 220))
+            surface.blit(text, (bar_rect.right + 10, bar_rect.y - 2))
+        elif self.status_message and self.game.input.time - self.status_time < STATUS_TIME:
+            surface.blit(render_text(self.status_message, 20, self.status_color), (20, 50))
 
     def cancel_save(self):
         """Отменяет сохранение и закрывает диалог"""
@@ -732,6 +841,7 @@ class MapEditorScene:
                 lambda: self.scroll_maps(1)
             )
         ]
+        self.load_dialog_ui = UILayer(self.load_dialog_buttons)
 
     def load_map_dialog(self):
         """Активирует диалог загрузки карты"""
@@ -742,30 +852,6 @@ class MapEditorScene:
         self.load_error = ""
         self.prepare_map_previews()
 
-    def load_map(self, filepath):
-        """Загружает карту из файла с улучшениями"""
-        try:
-            with open(filepath, 'r') as f:
-                map_info = json.load(f)
-
-            # Создаем новую карту
-            size = map_info['size']
-            default_tile = map_info.get('default_tile', 'grass')
-            self.map = Map(size, size, default_tile)
-            self.map.tiles = map_info['tiles']
-
-            # Сбрасываем параметры камеры
-            self.map.camera_x = 0
-            self.map.camera_y = 0
-            self.map.tile_size = 24  # Сброс масштаба
-
-            print(f"Карта {os.path.basename(filepath)} загружена")
-        except Exception as e:
-            print(f"Ошибка загрузки карты: {e}")
-            self.load_error = f"Ошибка загрузки: {str(e)}"
-            # Создаем новую карту при ошибке
-            self.create_map(64, 'grass')
-
     def perform_load(self):
         """Загружает выбранную карту"""
         if self.selected_map_index == -1:
@@ -794,13 +880,17 @@ class MapEditorScene:
             preview.fill(color)
 
             # Добавляем название файла
-            font = pygame.font.Font(None, 16)
-            text = font.render(os.path.splitext(map_file)[0], True, (255, 255, 255))
+            text = render_text(os.path.splitext(map_file)[0], 16, (255, 255, 255))
             text_rect = text.get_rect(center=(50, 15))
             preview.blit(text, text_rect)
 
-            # Добавляем информацию о размере
-            size_text = font.render("64x64", True, (200, 200, 200))  # Заглушка
+            # Добавляем информацию о размере (у .smap читается только заголовок)
+            try:
+                info = read_map_info(os.path.join("maps", map_file))
+                size_label = f"{info['width']}x{info['height']}"
+            except (OSError, ValueError, KeyError):
+                size_label = "?"
+            size_text = render_text(size_label, 16, (200, 200, 200))
             size_rect = size_text.get_rect(center=(50, 85))
             preview.blit(size_text, size_rect)
 
@@ -813,25 +903,74 @@ class MapEditorScene:
 
     def get_map_files(self):
         """Возвращает список доступных карт"""
-        if not os.path.exists("maps"):
-            return []
-
-        return [f for f in os.listdir("maps") if f.endswith('.json')]
+        return list_map_files("maps")
 
     def load_map(self, filepath):
-        """Загружает карту из файла"""
-        try:
-            with open(filepath, 'r') as f:
-                map_info = json.load(f)
+        """Начинает фоновую загрузку карты из файла (см. poll_load)"""
+        if self.load_job is not None:
+            self.load_job.cancel()
+        self.load_job = LoadJob(filepath).start()
+        self.stroke = None
+        self.show_load_dialog = False
+        if self.game.sync_jobs:
+            self.load_job.wait()
+            self.poll_load()
+
+    def poll_load(self):
+        """Переносит в карту пришедшие чанки и завершает загрузку"""
+        job = self.load_job
+        if job is None or not job.poll():
+            return
+        self.load_job = None
+        filename = os.path.basename(job.path)
+        if job.error is None:
+            self.map = job.map
+            self.start_journal(file_base(job.path))
+            print(f"Карта {filename} загружена")
+        else:
+            print(f"Ошибка загрузки карты: {job.error}")
+            self.show_status(f"Ошибка загрузки: {job.error}", error=True)
+            if self.map is None:
+                self.create_map(64, 'grass')
+
+    def cancel_loading(self):
+        """Прерывает загрузку: остается прежняя карта, а если ее нет - возврат в меню"""
+        self.load_job.cancel()
+        self.load_job = None
+        print("Загрузка карты отменена")
+        if self.map is None:
+            self.game.change_scene("map_editor_menu")
+
+    def render_loading(self, surface):
+        """Экран загрузки: уже пришедшая часть карты, прогресс и кнопка отмены"""
+        surface.fill((0, 0, 0))
+        job = self.load_job
+        if job is not None and job.map is not None:
+            self.map_renderer.draw(surface, job.map)
+            surface.blit(dim_overlay(surface.get_size(), 150), (0, 0))
+
+        center_x, center_y = surface.get_width() // 2, surface.get_height() // 2
+        text = render_text("Загрузка...", 48, (255, 255, 255))
+        surface.blit(text, text.get_rect(center=(center_x, center_y - 30)))
+        if job is None:
+            return
 
-            self.map = Map(map_info['size'], map_info['size'], map_info.get('default_tile', 'grass'))
-            self.map.tiles = map_info['tiles']
-            self.show_load_dialog = False
-            print(f"Карта {os.path.basename(filepath)} загружена")
-        except Exception as e:
-            print(f"Ошибка загрузки карты: {e}")
+        bar_rect = pygame.Rect(center_x - 200, center_y + 10, 400, 20)
+        pygame.draw.rect(surface, (30, 35, 45), bar_rect)
+        fill_rect = bar_rect.copy()
+        fill_rect.width = round(bar_rect.width * job.progress)
+        pygame.draw.rect(surface, (100, 150, 200), fill_rect)
+        pygame.draw.rect(surface, (100, 110, 140), bar_rect, 1)
+        percent = render_text(f"{job.progress:.0%}", 20, (220, 220, 220))
+        surface.blit(percent, percent.get_rect(center=(center_x, center_y + 50)))
+        self.loading_ui.draw(surface)
+
+    def grid_button_text(self):
+        # Без карты сетка включена, как у новой карты
+        show_grid = self.map.show_grid if self.map else True
+        return f"Сетка: {'ВКЛ' if show_grid else 'ВЫКЛ'}"
 
     def toggle_grid(self):
         if self.map:
             self.map.show_grid = not self.map.show_grid
-            self.grid_button.text = f"Сетка: {'ВКЛ' if self.map.show_grid else 'ВЫКЛ'}"
+            self.grid_button.text = self.grid_button_text()
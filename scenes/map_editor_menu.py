@@ -2,9 +2,15 @@ import pygame
 import os
 import json
 from ui.button import Button
+from ui.layer import UILayer
+from ui.overlay import dim_overlay
+from ui.text import render_text
+from world.journal import crashed_sessions, discard_session, has_journal
+from world.mapfile import list_map_files
+from scenes.ui_scene import UIScene
 
 
-class MapEditorMenuScene:
+class MapEditorMenuScene(UIScene):
     def __init__(self, game):
         self.game = game
         self.buttons = []
@@ -15,6 +21,7 @@ class MapEditorMenuScene:
         self.load_error = ""
         self.scroll_offset = 0
         self.items_per_page = 6
+        self.redraw = True  # Следующий кадр рисуется целиком
 
         self.init_ui()
 
@@ -47,6 +54,22 @@ class MapEditorMenuScene:
             )
         ]
 
+        # Появляются, только если после сбоя остался журнал автосохранения
+        self.restore_buttons = [
+            Button(
+                start_x, start_y + 3 * (btn_height + 20),
+                btn_width, btn_height,
+                "Восстановить",
+                self.restore_map
+            ),
+            Button(
+                start_x, start_y + 4 * (btn_height + 20),
+                btn_width, btn_height,
+                "Отбросить",
+                self.discard_restore
+            )
+        ]
+
         # Кнопки для диалога загрузки
         self.load_dialog_buttons = [
             Button(
@@ -75,19 +98,48 @@ class MapEditorMenuScene:
             )
         ]
 
+        self.ui = UILayer(self.menu_buttons())
+        self.load_dialog_ui = UILayer(self.load_dialog_buttons)
+
+    def menu_buttons(self):
+        if has_journal(self.game.autosave_dir):
+            return self.buttons + self.restore_buttons
+        return self.buttons
+
     def on_enter(self):
         print("Вход в меню редактора карт")
         self.load_dialog_active = False
+        self.ui = UILayer(self.menu_buttons())
+        self.redraw = True
+
+    def restore_map(self):
+        """Открывает в редакторе карту, восстановленную из журнала автосохранения"""
+        self.game.editor_params = {"recover": True}
+        self.game.change_scene("map_editor")
+
+    def discard_restore(self):
+        """Удаляет журнал автосохранения, оставшийся после сбоя, без восстановления"""
+        sessions = crashed_sessions(self.game.autosave_dir)
+        if sessions:
+            discard_session(sessions[-1])
+        self.ui = UILayer(self.menu_buttons())
+        self.redraw = True
 
     def on_exit(self):
         print("Выход из меню редактора карт")
 
     def handle_events(self, events):
+        # Клики и клавиши могут менять список карт, выбор и сообщения -
+        # после них сцена перерисовывается целиком
+        for event in events:
+            if event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.KEYDOWN):
+                self.redraw = True
+                break
+
         if self.load_dialog_active:
             for event in events:
                 # Обработка кнопок диалога
-                for button in self.load_dialog_buttons:
-                    button.handle_event(event)
+                self.load_dialog_ui.dispatch(event)
 
                 # Обработка выбора карты
                 if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
@@ -118,38 +170,38 @@ class MapEditorMenuScene:
 
         # Обработка основного меню
         for event in events:
-            for button in self.buttons:
-                button.handle_event(event)
+            self.ui.dispatch(event)
 
     def update(self, dt):
         pass
 
-    def render(self, surface):
+    def compose_ui(self, size):
+        dirty = self.ui.compose(size)
+        if self.load_dialog_active:
+            dirty = dirty + self.load_dialog_ui.compose(size)
+        return dirty
+
+    def draw_scene(self, surface):
         surface.fill((40, 45, 60))
 
         # Заголовок
-        title_font = pygame.font.Font(None, 60)
-        title = title_font.render("Редактор карт", True, (220, 240, 255))
+        title = render_text("Редактор карт", 60, (220, 240, 255))
         title_rect = title.get_rect(center=(surface.get_width() // 2, surface.get_height() * 0.2))
         surface.blit(title, title_rect)
 
         # Сообщение об ошибке
         if self.load_error:
-            error_font = pygame.font.Font(None, 30)
-            error_text = error_font.render(self.load_error, True, (255, 100, 100))
+            error_text = render_text(self.load_error, 30, (255, 100, 100))
             surface.blit(error_text, (surface.get_width() // 2 - error_text.get_width() // 2, surface.get_height() * 0.15))
 
-        for button in self.buttons:
-            button.draw(surface)
+        self.ui.blit(surface)
 
         if self.load_dialog_active:
             """Отрисовывает диалог загрузки карты"""
             screen_width, screen_height = surface.get_size()
 
             # Полупрозрачный фон
-            overlay = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 90))
-            surface.blit(overlay, (0, 0))
+            surface.blit(dim_overlay(surface.get_size(), 90), (0, 0))
 
             # Основное окно диалога
             dialog_rect = pygame.Rect(100, 100, screen_width - 200, screen_height - 200)
@@ -157,8 +209,7 @@ class MapEditorMenuScene:
             pygame.draw.rect(surface, (100, 110, 140), dialog_rect, 2, border_radius=10)
 
             # Заголовок
-            title_font = pygame.font.Font(None, 36)
-            title = title_font.render("Выберите карту для загрузки", True, (220, 240, 255))
+            title = render_text("Выберите карту для загрузки", 36, (220, 240, 255))
             surface.blit(title, (screen_width // 2 - title.get_width() // 2, 120))
 
             # Список карт
@@ -181,30 +232,25 @@ class MapEditorMenuScene:
                 surface.blit(thumbnail, (thumb_x, thumb_y))
 
                 # Название файла
-                font = pygame.font.Font(None, 20)
-                name_text = font.render(os.path.splitext(map_file)[0], True, (200, 200, 200))
+                name_text = render_text(os.path.splitext(map_file)[0], 20, (200, 200, 200))
                 surface.blit(name_text, (thumb_x + 10, thumb_y + 105))
 
             # Информация о прокрутке
             scroll_info = f"Карты {self.scroll_offset + 1}-{min(self.scroll_offset + self.items_per_page, len(self.map_files))} из {len(self.map_files)}"
-            info_text = font.render(scroll_info, True, (200, 200, 200))
+            info_text = render_text(scroll_info, 20, (200, 200, 200))
             surface.blit(info_text, (120, screen_height - 150))
 
             # Сообщение об ошибке
             if self.load_error:
-                error_font = pygame.font.Font(None, 26)
-                error_text = error_font.render(self.load_error, True, (255, 100, 100))
+                error_text = render_text(self.load_error, 26, (255, 100, 100))
                 surface.blit(error_text, (screen_width // 2 - error_text.get_width() // 2, 150))
 
             # Кнопки диалога
-            for button in self.load_dialog_buttons:
-                button.draw(surface)
+            self.load_dialog_ui.blit(surface)
 
     def get_map_files(self):
         """Возвращает список доступных карт"""
-        if not os.path.exists("maps"):
-            return []
-        return [f for f in os.listdir("maps") if f.endswith('.json')]
+        return list_map_files("maps")
 
     def prepare_map_previews(self):
         """Создаёт миниатюры для карт"""
@@ -217,8 +263,7 @@ class MapEditorMenuScene:
             preview.fill(color)
 
             # Добавляем название файла
-            font = pygame.font.Font(None, 20)
-            text = font.render(os.path.splitext(map_file)[0], True, (255, 255, 255))
+            text = render_text(os.path.splitext(map_file)[0], 20, (255, 255, 255))
             text_rect = text.get_rect(center=(90, 20))
             preview.blit(text, text_rect)
 
@@ -1,10 +1,12 @@
 import pygame
-import time
 from ui.button import Button
 from ui.dropdown import Dropdown
+from ui.layer import UILayer
+from ui.text import render_text
+from scenes.ui_scene import UIScene
 
 
-class MapEditorParamsScene:
+class MapEditorParamsScene(UIScene):
     def __init__(self, game):
         self.game = game
         self.size_dropdown = None
@@ -12,6 +14,7 @@ class MapEditorParamsScene:
         self.create_button = None
         self.back_button = None
         self.last_dropdown_action_time = 0
+        self.redraw = True  # Следующий кадр рисуется целиком
         self.init_ui()
 
     def init_ui(self):
@@ -71,8 +74,11 @@ class MapEditorParamsScene:
             lambda: self.game.change_scene("map_editor_menu")
         )
 
+        # Открытый список рисуется поверх остальных элементов слоя
+        self.ui = UILayer([self.create_button, self.back_button, self.size_dropdown, self.terrain_dropdown])
+
     def create_map(self):
-        current_time = time.time()
+        current_time = self.game.input.time / 1000.0  # Время кадра, сек
         if current_time - self.last_dropdown_action_time < 0.3:
             return
 
@@ -105,69 +111,37 @@ class MapEditorParamsScene:
 
     def on_enter(self):
         print("Выбор параметров карты")
+        self.redraw = True
         self.last_dropdown_action_time = 0
 
     def on_exit(self):
         print("Выход из выбора параметров")
 
     def handle_events(self, events):
-        current_time = time.time()
-        dropdown_interaction = False
-
         for event in events:
-            # Обработка только релевантных событий (мыши и клавиатуры)
-            if event.type not in [pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION, pygame.KEYDOWN]:
-                continue
-
-            # Закрытие других списков при открытии одного
-            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                if self.size_dropdown.rect.collidepoint(event.pos):
-                    self.terrain_dropdown.is_open = False
-                elif self.terrain_dropdown.rect.collidepoint(event.pos):
-                    self.size_dropdown.is_open = False
-
-            # Обработка событий для выпадающих списков
-            if self.size_dropdown.handle_event(event):
-                self.last_dropdown_action_time = current_time
-                dropdown_interaction = True
-
-            if self.terrain_dropdown.handle_event(event):
-                self.last_dropdown_action_time = current_time
-                dropdown_interaction = True
-
-        # Обработка кнопок
-        if not dropdown_interaction and current_time - self.last_dropdown_action_time > 0.3:
-            for event in events:
-                self.create_button.handle_event(event)
-                self.back_button.handle_event(event)
+            # Открытый список забирает все клики мыши (UILayer.grab), поэтому
+            # выбор опции поверх кнопки не нажимает кнопку
+            receiver = self.ui.dispatch(event)
+            if (event.type == pygame.MOUSEBUTTONDOWN and
+                    receiver in (self.size_dropdown, self.terrain_dropdown)):
+                self.last_dropdown_action_time = self.game.input.time / 1000.0  # Время кадра, сек
 
     def update(self, dt):
         pass
 
-    def render(self, surface):
+    def draw_scene(self, surface):
         surface.fill((50, 55, 75))
 
         # Заголовок
-        title_font = pygame.font.Font(None, 60)
-        title = title_font.render("Параметры карты", True, (220, 240, 255))
+        title = render_text("Параметры карты", 60, (220, 240, 255))
         title_rect = title.get_rect(center=(surface.get_width() // 2, 100))
         surface.blit(title, title_rect)
 
         # Подписи
-        font = pygame.font.Font(None, 36)
-        size_label = font.render("Размер карты:", True, (200, 200, 200))
-        terrain_label = font.render("Тип поверхности:", True, (200, 200, 200))
+        size_label = render_text("Размер карты:", 36, (200, 200, 200))
+        terrain_label = render_text("Тип поверхности:", 36, (200, 200, 200))
         surface.blit(size_label, (surface.get_width() // 2 - 150, 160))
         surface.blit(terrain_label, (surface.get_width() // 2 - 150, 260))
 
-        # Отрисовка кнопок
-        self.create_button.draw(surface)
-        self.back_button.draw(surface)
-
-        # Отрисовка закрытых состояний выпадающих списков
-        self.size_dropdown.draw_closed(surface)
-        self.terrain_dropdown.draw_closed(surface)
-
-        # Отрисовка открытых состояний поверх всего
-        self.size_dropdown.draw_open(surface)
-        self.terrain_dropdown.draw_open(surface)
+        # Кнопки и выпадающие списки
+        self.ui.blit(surface)
@@ -1,12 +1,15 @@
-import pygame
 from ui.button import Button
+from ui.layer import UILayer
+from ui.text import render_text
 from scenes.main_menu import MainMenuScene
+from scenes.ui_scene import UIScene
 
 
-class MapSelectScene:
+class MapSelectScene(UIScene):
     def __init__(self, game):
         self.game = game
         self.buttons = []
+        self.redraw = True  # Следующий кадр рисуется целиком
         self.init_ui()
 
     def init_ui(self):
@@ -44,9 +47,11 @@ class MapSelectScene:
                 lambda: self.game.change_scene("main_menu")
             )
         ]
+        self.ui = UILayer(self.buttons)
 
     def on_enter(self):
         print("Вход в выбор карты")
+        self.redraw = True
         self.init_ui()
 
     def on_exit(self):
@@ -54,29 +59,25 @@ class MapSelectScene:
 
     def handle_events(self, events):
         for event in events:
-            for button in self.buttons:
-                button.handle_event(event)
+            self.ui.dispatch(event)
 
     def update(self, dt):
         pass
 
-    def render(self, surface):
+    def draw_scene(self, surface):
         surface.fill((45, 50, 70))
 
         # Заголовок
-        title_font = pygame.font.Font(None, 60)
-        title = title_font.render("Выбор карты", True, (220, 240, 255))
+        title = render_text("Выбор карты", 60, (220, 240, 255))
         title_rect = title.get_rect(center=(surface.get_width() // 2, surface.get_height() * 0.15))
         surface.blit(title, title_rect)
 
-        for button in self.buttons:
-            button.draw(surface)
+        self.ui.blit(surface)
 
         # Подписи карт
-        font = pygame.font.Font(None, 28)
         texts = ["Лесная долина", "Пустынный каньон", "Случайная генерация"]
         for i, text in enumerate(texts):
-            text_surf = font.render(text, True, (200, 200, 200))
+            text_surf = render_text(text, 28, (200, 200, 200))
             text_rect = text_surf.get_rect(
                 center=(self.buttons[i].rect.centerx, self.buttons[i].rect.bottom + 20)
             )
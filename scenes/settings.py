@@ -1,11 +1,14 @@
-import pygame
 from ui.button import Button
+from ui.layer import UILayer
+from ui.text import render_text
+from scenes.ui_scene import UIScene
 
 
-class SettingsScene:
+class SettingsScene(UIScene):
     def __init__(self, game):
         self.game = game
         self.buttons = []
+        self.redraw = True  # Следующий кадр рисуется целиком
         self.init_ui()
 
     def init_ui(self):
@@ -37,6 +40,7 @@ class SettingsScene:
                 lambda: self.game.change_scene("main_menu")
             )
         ]
+        self.ui = UILayer(self.buttons)
 
     def toggle_fullscreen(self):
         self.game.settings["fullscreen"] = not self.game.settings["fullscreen"]
@@ -61,11 +65,11 @@ class SettingsScene:
     def apply_settings(self):
         self.game.save_settings()
         self.game.init_screen()  # Обновляем экран
-        self.game.reload_scenes()  # Пересоздаем все сцены
-        self.init_ui()  # Обновляем UI настроек
+        self.game.reload_scenes()  # Перестраиваем интерфейс сцен под новый экран
 
     def on_enter(self):
         print("Вход в настройки")
+        self.redraw = True
         self.init_ui()  # Инициализируем UI при каждом входе
 
     def on_exit(self):
@@ -73,20 +77,17 @@ class SettingsScene:
 
     def handle_events(self, events):
         for event in events:
-            for button in self.buttons:
-                button.handle_event(event)
+            self.ui.dispatch(event)
 
     def update(self, dt):
         pass
 
-    def render(self, surface):
+    def draw_scene(self, surface):
         surface.fill((50, 55, 75))
 
         # Заголовок
-        title_font = pygame.font.Font(None, 60)
-        title = title_font.render("Настройки", True, (220, 240, 255))
+        title = render_text("Настройки", 60, (220, 240, 255))
         title_rect = title.get_rect(center=(surface.get_width() // 2, surface.get_height() * 0.15))
         surface.blit(title, title_rect)
 
-        for button in self.buttons:
-            button.draw(surface)
+        self.ui.blit(surface)
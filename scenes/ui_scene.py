@@ -0,0 +1,26 @@
+class UIScene:
+    """Основа сцен-меню: экран перерисовывается, только когда что-то изменилось.
+
+    Сцена задает self.ui (ui.layer.UILayer) и флаг self.redraw, а рисует
+    себя в draw_scene. render возвращает области для вывода на экран:
+    None - весь экран, [] - экран не изменился.
+    """
+
+    def compose_ui(self, size):
+        """Собирает слои интерфейса сцены, возвращает измененные области"""
+        return self.ui.compose(size)
+
+    def draw_scene(self, surface):
+        raise NotImplementedError
+
+    def render(self, surface):
+        dirty = self.compose_ui(surface.get_size())
+        if not self.redraw and not dirty:
+            return []  # Экран не изменился
+
+        self.draw_scene(surface)
+
+        if self.redraw:
+            self.redraw = False
+            return None  # Весь экран
+        return dirty
@@ -0,0 +1,143 @@
+"""Журнал правок (world.journal) и снимки карты (world.mapfile.MapSnapshot)"""
+import os
+import pytest
+from world import journal
+from world.brush import get_mask
+from world.journal import (EditJournal, crashed_sessions, journal_path, new_map_base, read_journal,
+                           recover_map)
+from world.map import Map
+from world.mapfile import MapSnapshot, open_map_file, save_map_file
+from world.stroke import Stroke
+
+
+def map_rows(game_map):
+    return [game_map.get_row(y) for y in range(game_map.height)]
+
+
+def edit_map(game_map):
+    """Правки всех видов, которые пишутся в журнал"""
+    game_map.set_tile(3, 4, 'water')
+    game_map.set_rect(10, 10, 20, 5, 'sand')
+    game_map.set_tiles_area(40, 30, 6, 'forest')
+    stroke = Stroke(game_map, 'lava', get_mask('disk', 2))  # Тип не из стандартного набора
+    for x in range(5, 60, 3):
+        stroke.add_point(x, x // 2)
+    game_map.fill_area(0, 0, 'grass', 'earth')
+
+
+def crash(edit_journal):
+    """Сбой: файлы остаются на диске, захват сессии освобождается"""
+    edit_journal.map.listeners.remove(edit_journal.record)
+    if edit_journal.job is not None:
+        edit_journal.job.thread.join()
+    edit_journal.file.close()
+    edit_journal.lock.close()
+
+
+def test_recover_replays_all_edits(tmp_path):
+    game_map = Map(64, 48, 'grass')
+    edit_journal = EditJournal(game_map, new_map_base(game_map), str(tmp_path))
+    edit_map(game_map)
+    edit_journal.update()
+    crash(edit_journal)
+
+    sessions = crashed_sessions(str(tmp_path))
+    assert sessions == [edit_journal.directory]
+    assert map_rows(recover_map(sessions[0])) == map_rows(game_map)
+
+
+def test_live_session_is_not_crashed(tmp_path):
+    game_map = Map(32, 32)
+    edit_journal = EditJournal(game_map, new_map_base(game_map), str(tmp_path))
+    game_map.set_tile(1, 1, 'sand')
+    edit_journal.update()
+    assert crashed_sessions(str(tmp_path)) == []
+
+    edit_journal.close()
+    assert os.listdir(str(tmp_path)) == []
+
+
+@pytest.mark.parametrize("damage", ["truncate", "crc"])
+def test_damaged_last_record_is_dropped(tmp_path, damage):
+    game_map = Map(64, 48, 'grass')
+    edit_journal = EditJournal(game_map, new_map_base(game_map), str(tmp_path))
+    edit_map(game_map)
+    edit_journal.update()
+    expected = map_rows(game_map)
+    size = os.path.getsize(journal_path(edit_journal.directory, 0))
+
+    game_map.set_rect(0, 0, 64, 48, 'water')  # Последняя запись, которую портит сбой
+    edit_journal.update()
+    crash(edit_journal)
+
+    path = journal_path(edit_journal.directory, 0)
+    with open(path, "r+b") as f:
+        if damage == "truncate":
+            f.truncate(os.path.getsize(path) - 3)
+        else:
+            f.seek(size + journal.RECORD_HEADER.size + 2)
+            byte = f.read(1)
+            f.seek(-1, os.SEEK_CUR)
+            f.write(bytes([byte[0] ^ 0xFF]))
+
+    _, records = read_journal(path)
+    assert records[-1][0] != 'rect' or records[-1][2] != (0, 0, 64, 48)
+    assert map_rows(recover_map(edit_journal.directory)) == expected
+
+
+def test_compaction_rolls_generation(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, "MIN_COMPACT_BYTES", 0)
+    game_map = Map(64, 64, 'grass')
+    edit_journal = EditJournal(game_map, new_map_base(game_map), str(tmp_path))
+    for i in range(200):
+        game_map.set_tile(i % 64, i // 4, 'sand' if i % 2 else 'water')
+        edit_journal.update()
+    edit_journal.wait()
+    generation = edit_journal.generation
+    assert generation > 0
+    assert sorted(os.listdir(edit_journal.directory)) == [
+        f"journal-{generation}.log", "lock", f"snapshot-{generation}.smap"]
+
+    # Сбой посреди сжатия: недописанный снимок не мешает восстановлению
+    game_map.set_rect(5, 5, 10, 10, 'forest')
+    edit_journal.update()
+    crash(edit_journal)
+    assert map_rows(recover_map(edit_journal.directory)) == map_rows(game_map)
+
+
+def test_edit_during_save_leaves_snapshot_intact(tmp_path):
+    game_map = Map(64, 64, 'grass')
+    game_map.set_rect(0, 0, 64, 10, 'sand')
+    expected = map_rows(game_map)
+
+    # Два перекрывающихся снимка (сохранение и сжатие журнала)
+    save = MapSnapshot(game_map)
+    compaction = MapSnapshot(game_map)
+    game_map.set_rect(0, 0, 64, 64, 'water')
+    compaction.release(game_map)
+    game_map.set_rect(0, 20, 64, 5, 'forest')  # Правка после освобождения одного из снимков
+
+    path = str(tmp_path / "save.smap")
+    save.write(path)
+    save.release(game_map)
+    assert map_rows(open_map_file(path)) == expected
+    assert all(chunk.frozen == 0 for chunk in game_map.chunks)
+
+
+def test_edit_during_save_of_lazy_map(tmp_path):
+    source = str(tmp_path / "source.smap")
+    base = Map(256, 256, 'grass')
+    base.set_rect(0, 0, 256, 3, 'sand')
+    save_map_file(base, source)
+
+    game_map = open_map_file(source, capacity=4)
+    game_map.set_rect(100, 100, 10, 10, 'water')
+    expected = map_rows(game_map)
+
+    snapshot = MapSnapshot(game_map)
+    game_map.set_rect(100, 100, 10, 10, 'forest')
+    game_map.set_rect(0, 200, 256, 2, 'forest')
+    path = str(tmp_path / "save.smap")
+    snapshot.write(path)
+    snapshot.release(game_map)
+    assert map_rows(open_map_file(path)) == expected
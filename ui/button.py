@@ -1,9 +1,11 @@
 import pygame
+from ui.text import render_text
+from ui.widget import Widget
 
 
-class Button:
+class Button(Widget):
     def __init__(self, x, y, width, height, text, action=None):
-        self.rect = pygame.Rect(x, y, width, height)
+        super().__init__(x, y, width, height)
         self.text = text
         self.action = action
         self.colors = {
@@ -12,7 +14,7 @@ class Button:
             "pressed": (50, 100, 150)
         }
         self.state = "normal"
-        self.font = pygame.font.Font(None, 36)
+        self.font_size = 36
 
     def handle_event(self, event):
         if event.type == pygame.MOUSEMOTION:
@@ -33,10 +35,14 @@ class Button:
         else:
             self.state = "normal"
 
-    def draw(self, surface):
-        pygame.draw.rect(surface, self.colors[self.state], self.rect, border_radius=8)
-        pygame.draw.rect(surface, (30, 30, 30), self.rect, 2, border_radius=8)
+    def look_key(self):
+        return self.state, self.text
 
-        text_surf = self.font.render(self.text, True, (255, 255, 255))
-        text_rect = text_surf.get_rect(center=self.rect.center)
+    def paint(self, surface, origin):
+        rect = self.rect.move(-origin[0], -origin[1])
+        pygame.draw.rect(surface, self.colors[self.state], rect, border_radius=8)
+        pygame.draw.rect(surface, (30, 30, 30), rect, 2, border_radius=8)
+
+        text_surf = render_text(self.text, self.font_size, (255, 255, 255))
+        text_rect = text_surf.get_rect(center=rect.center)
         surface.blit(text_surf, text_rect)
@@ -1,16 +1,18 @@
 import pygame
+from ui.text import render_text
+from ui.widget import Widget
 
 
-class Dropdown:
+class Dropdown(Widget):
     def __init__(self, x, y, width, height, options, default_index=0):
-        self.rect = pygame.Rect(x, y, width, height)
+        super().__init__(x, y, width, height)
         self.options = options
         self.selected_index = default_index
         self.is_open = False
         self.option_rects = []
         self.last_click_time = 0
-        self.z_index = 0
-        self.surface = None  # Поверхность для открытого списка
+        self.hovered = False
+        self.hover_index = -1  # Опция под курсором в открытом списке
 
         # Цвета
         self.bg_color = (70, 70, 90)
@@ -21,7 +23,7 @@ class Dropdown:
         self.shadow_color = (0, 0, 0, 100)
 
         # Шрифт
-        self.font = pygame.font.Font(None, 28)
+        self.font_size = 28
 
         # Создаем прямоугольники для опций
         for i in range(len(options)):
@@ -38,26 +40,28 @@ class Dropdown:
         if event is None:
             return False
 
-        current_time = pygame.time.get_ticks()
+        # Подсветка при наведении отслеживается по движению мыши
+        if event.type == pygame.MOUSEMOTION:
+            self.hovered = self.rect.collidepoint(event.pos)
+            self.hover_index = -1
+            for i, rect in enumerate(self.option_rects):
+                if rect.collidepoint(event.pos):
+                    self.hover_index = i
+            return False
 
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            current_time = event.time  # Время кадра из utils.input.InputLayer
             # Проверяем, было ли нажатие на основной прямоугольник
             if self.rect.collidepoint(event.pos):
                 if current_time - self.last_click_time > 300:
                     self.is_open = not self.is_open
                     self.last_click_time = current_time
-                    # При открытии создаем новую поверхность
-                    if self.is_open:
-                        self.create_open_list_surface()
                 return True
 
             # Если выпадающий список открыт, проверяем опции
-            if self.is_open and self.surface:
-                # Переводим координаты мыши в координаты поверхности списка
-                rel_pos = (event.pos[0], event.pos[1])
-
+            if self.is_open:
                 for i, rect in enumerate(self.option_rects):
-                    if rect.collidepoint(rel_pos):
+                    if rect.collidepoint(event.pos):
                         if current_time - self.last_click_time > 300:
                             self.selected_index = i
                             self.is_open = False
@@ -71,108 +75,84 @@ class Dropdown:
 
         return False
 
-    def create_open_list_surface(self):
-        """Создает поверхность для открытого списка с правильными размерами"""
-        # Определяем размеры для поверхности
-        height = self.rect.height * (len(self.options) + 1)
-        width = self.rect.width
-
-        # Создаем поверхность с альфа-каналом
-        self.surface = pygame.Surface((width, height), pygame.SRCALPHA)
-
-        # Рисуем фон для всего списка
-        pygame.draw.rect(self.surface, self.shadow_color, (0, 0, width, height), border_radius=4)
-
-        # Рисуем основной прямоугольник (верхний элемент)
-        pygame.draw.rect(self.surface, self.bg_color, (0, 0, width, self.rect.height), border_radius=4)
-        pygame.draw.rect(self.surface, self.border_color, (0, 0, width, self.rect.height), 2, border_radius=4)
-
-        # Текст выбранной опции
-        text = self.font.render(self.options[self.selected_index], True, self.text_color)
-        text_rect = text.get_rect(midleft=(10, self.rect.height // 2))
-        self.surface.blit(text, text_rect)
-
-        # Стрелка вниз
-        arrow_size = 6
-        arrow_x = width - 20
-        arrow_y = self.rect.height // 2
-        pygame.draw.polygon(self.surface, self.text_color, [
-            (arrow_x, arrow_y - arrow_size // 2),
-            (arrow_x + arrow_size, arrow_y - arrow_size // 2),
-            (arrow_x + arrow_size // 2, arrow_y + arrow_size // 2)
-        ])
-
-        # Рисуем опции
-        for i, rect in enumerate(self.option_rects):
-            y_pos = self.rect.height * (i + 1)
-
-            # Выделяем выбранный элемент другим цветом
-            if i == self.selected_index:
-                item_color = self.selected_color
-            else:
-                # Для определения наведения нужно будет обрабатывать в реальном времени
-                item_color = self.bg_color
-
-            pygame.draw.rect(self.surface, item_color, (0, y_pos, width, self.rect.height), border_radius=4)
-            pygame.draw.rect(self.surface, self.border_color, (0, y_pos, width, self.rect.height), 2, border_radius=4)
-
-            option_text = self.font.render(self.options[i], True, self.text_color)
-            option_rect = option_text.get_rect(midleft=(10, y_pos + self.rect.height // 2))
-            self.surface.blit(option_text, option_rect)
-
-    def draw_closed(self, surface):
-        """Рисует закрытое состояние выпадающего списка"""
-        color = self.hover_color if self.rect.collidepoint(pygame.mouse.get_pos()) else self.bg_color
-        pygame.draw.rect(surface, color, self.rect, border_radius=4)
-        pygame.draw.rect(surface, self.border_color, self.rect, 2, border_radius=4)
-
-        text = self.font.render(self.options[self.selected_index], True, self.text_color)
-        text_rect = text.get_rect(midleft=(self.rect.x + 10, self.rect.centery))
+    @property
+    def bounds(self):
+        if self.is_open:
+            return self.rect.union(self.option_rects[-1]) if self.option_rects else self.rect
+        return self.rect
+
+    @property
+    def hit_rect(self):
+        return self.bounds
+
+    def grabs_pointer(self):
+        # Открытый список закрывается кликом в любом месте экрана
+        return self.is_open
+
+    def layer_order(self):
+        # Открытый список рисуется поверх всех закрытых
+        return (1 if self.is_open else 0), self.z_index
+
+    def look_key(self):
+        if self.is_open:
+            return True, self.selected_index, self.hover_index
+        return False, self.selected_index, self.hovered
+
+    def paint(self, surface, origin):
+        if self.is_open:
+            self.paint_open(surface, origin)
+        else:
+            self.paint_closed(surface, origin)
+
+    def paint_header(self, surface, rect, color):
+        """Рисует основной прямоугольник с выбранной опцией и стрелкой"""
+        pygame.draw.rect(surface, color, rect, border_radius=4)
+        pygame.draw.rect(surface, self.border_color, rect, 2, border_radius=4)
+
+        text = render_text(self.options[self.selected_index], self.font_size, self.text_color)
+        text_rect = text.get_rect(midleft=(rect.x + 10, rect.centery))
         surface.blit(text, text_rect)
 
         arrow_size = 6
-        arrow_x = self.rect.right - 20
-        arrow_y = self.rect.centery
+        arrow_x = rect.right - 20
+        arrow_y = rect.centery
         pygame.draw.polygon(surface, self.text_color, [
             (arrow_x, arrow_y - arrow_size // 2),
             (arrow_x + arrow_size, arrow_y - arrow_size // 2),
             (arrow_x + arrow_size // 2, arrow_y + arrow_size // 2)
         ])
 
-    def draw_open(self, surface):
+    def paint_closed(self, surface, origin):
+        """Рисует закрытое состояние выпадающего списка"""
+        color = self.hover_color if self.hovered else self.bg_color
+        self.paint_header(surface, self.rect.move(-origin[0], -origin[1]), color)
+
+    def paint_open(self, surface, origin):
         """Рисует открытое состояние выпадающего списка"""
-        if not self.is_open or not self.surface:
-            return
+        width = self.rect.width
+        height = self.rect.height * (len(self.options) + 1)
 
-        # Обновляем подсветку при наведении в реальном времени
-        mouse_pos = pygame.mouse.get_pos()
-        rel_pos = (mouse_pos[0] - self.rect.x, mouse_pos[1] - self.rect.y)
+        # Рисуем фон для всего списка
+        pygame.draw.rect(surface, self.shadow_color, (0, 0, width, height), border_radius=4)
 
-        # Создаем временную поверхность для обновления
-        updated_surface = self.surface.copy()
+        # Основной прямоугольник (верхний элемент)
+        self.paint_header(surface, pygame.Rect(0, 0, width, self.rect.height), self.bg_color)
 
-        # Обновляем подсветку для опций
-        for i, rect in enumerate(self.option_rects):
+        # Рисуем опции
+        for i in range(len(self.options)):
             y_pos = self.rect.height * (i + 1)
 
-            # Пропускаем выбранный элемент
+            # Выделяем выбранный элемент и элемент под курсором
             if i == self.selected_index:
-                continue
-
-            # Определяем цвет в зависимости от наведения
-            if rect.collidepoint(rel_pos):
+                item_color = self.selected_color
+            elif i == self.hover_index:
                 item_color = self.hover_color
             else:
                 item_color = self.bg_color
 
-            pygame.draw.rect(updated_surface, item_color, (0, y_pos, self.rect.width, self.rect.height),
-                             border_radius=4)
-            pygame.draw.rect(updated_surface, self.border_color, (0, y_pos, self.rect.width, self.rect.height), 2,
-                             border_radius=4)
+            pygame.draw.rect(surface, item_color, (0, y_pos, width, self.rect.height), border_radius=4)
+            pygame.draw.rect(surface, self.border_color, (0, y_pos, width, self.rect.height), 2, border_radius=4)
 
-            option_text = self.font.render(self.options[i], True, self.text_color)
+            option_text = render_text(self.options[i], self.font_size, self.text_color)
             option_rect = option_text.get_rect(midleft=(10, y_pos + self.rect.height // 2))
-            updated_surface.blit(option_text, option_rect)
-
-        # Рисуем всю поверхность списка поверх основного экрана
-        surface.blit(updated_surface, (self.rect.x, self.rect.y))
+            surface.blit(option_text, option_rect)
@@ -0,0 +1,186 @@
+import pygame
+
+# Размер ячейки сетки для поиска элемента под курсором, в пикселях
+HIT_CELL_SIZE = 64
+HIT_CELL_SHIFT = 6
+POINTER_BUTTONS = (1, 2, 3)
+
+
+def merge_rects(rects):
+    """Объединяет пересекающиеся прямоугольники, чтобы не выводить область дважды"""
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+class UILayer:
+    """Слой интерфейса: набор виджетов, собранный в кэшированную поверхность.
+
+    Каждый кадр слой сравнивает ключи внешнего вида и области виджетов с
+    прошлым кадром и перерисовывает в своей поверхности только изменившиеся
+    участки. На экран слой выводится одним вызовом blits по областям
+    виджетов.
+
+    Для событий мыши слой хранит сетку ячеек HIT_CELL_SIZE со списками
+    виджетов (сверху вниз), поэтому элемент под курсором находится одним
+    поиском, а событие получает только он (или захвативший мышь виджет).
+    """
+
+    def __init__(self, widgets=()):
+        self.widgets = list(widgets)
+        self.overlay = None
+        self.drawn = {}  # виджет -> (ключ вида, область) на момент композиции
+        self.areas = []
+        self.dirty_rects = []
+
+        self.hit_grid = {}  # (столбец, строка) -> виджеты сверху вниз
+        self.index_dirty = True
+        self.hit_cache = None  # (позиция, виджет) последнего поиска
+        self.hover = None  # виджет под курсором
+        self.capture = None  # виджет, на котором нажата кнопка мыши
+        self.grab = None  # виджет, забирающий все события мыши (открытый список)
+
+    def set_widgets(self, widgets):
+        self.widgets = list(widgets)
+        self.index_dirty = True
+
+    def add(self, widget):
+        self.widgets.append(widget)
+        self.index_dirty = True
+        return widget
+
+    def visible_widgets(self):
+        """Видимые виджеты в порядке наложения (снизу вверх)"""
+        return sorted((widget for widget in self.widgets if widget.visible),
+                      key=lambda widget: widget.layer_order())
+
+    def compose(self, size):
+        """Обновляет кэшированную поверхность слоя, возвращает измененные области"""
+        if self.overlay is None or self.overlay.get_size() != size:
+            self.overlay = pygame.Surface(size, pygame.SRCALPHA)
+            self.drawn = {}
+
+        widgets = self.visible_widgets()
+        state = {widget: (widget.look_key(), pygame.Rect(widget.bounds)) for widget in widgets}
+
+        dirty = []
+        for widget, (key, bounds) in state.items():
+            previous = self.drawn.get(widget)
+            if previous != (key, bounds):
+                dirty.append(bounds)
+                if previous is not None and previous[1] != bounds:
+                    dirty.append(previous[1])
+                    self.index_dirty = True
+        for widget, (_, bounds) in self.drawn.items():
+            if widget not in state:
+                dirty.append(bounds)
+                self.index_dirty = True
+
+        for rect in dirty:
+            self.overlay.set_clip(rect)
+            self.overlay.fill((0, 0, 0, 0))
+            for widget in widgets:
+                if state[widget][1].colliderect(rect):
+                    look, position = widget.get_look()
+                    self.overlay.blit(look, position)
+        self.overlay.set_clip(None)
+
+        self.drawn = state
+        if dirty or not self.areas:
+            self.areas = merge_rects(bounds for _, bounds in state.values())
+        self.dirty_rects = dirty
+        return dirty
+
+    def blit(self, surface):
+        """Выводит уже собранную поверхность слоя на surface"""
+        surface.blits([(self.overlay, area, area) for area in self.areas], False)
+
+    def draw(self, surface):
+        self.compose(surface.get_size())
+        self.blit(surface)
+
+    def rebuild_index(self):
+        """Раскладывает области видимых виджетов по ячейкам сетки"""
+        grid = {}
+        for widget in reversed(self.visible_widgets()):
+            bounds = widget.bounds
+            if bounds.width <= 0 or bounds.height <= 0:
+                continue
+            for row in range(bounds.top >> HIT_CELL_SHIFT, (bounds.bottom - 1 >> HIT_CELL_SHIFT) + 1):
+                for column in range(bounds.left >> HIT_CELL_SHIFT, (bounds.right - 1 >> HIT_CELL_SHIFT) + 1):
+                    grid.setdefault((column, row), []).append(widget)
+        self.hit_grid = grid
+        self.hit_cache = None
+        self.index_dirty = False
+
+    def widget_at(self, pos):
+        """Верхний видимый виджет в точке pos или None"""
+        if self.index_dirty:
+            self.rebuild_index()
+        elif self.hit_cache is not None and self.hit_cache[0] == pos:
+            return self.hit_cache[1]
+
+        x, y = int(pos[0]), int(pos[1])
+        found = None
+        for widget in self.hit_grid.get((x >> HIT_CELL_SHIFT, y >> HIT_CELL_SHIFT), ()):
+            if widget.hit_rect.collidepoint(x, y):
+                found = widget
+                break
+        self.hit_cache = (pos, found)
+        return found
+
+    def deliver(self, widget, event):
+        """Передает событие виджету и обновляет индекс, если виджет изменил свою область"""
+        bounds = pygame.Rect(widget.bounds)
+        widget.handle_event(event)
+        if widget.bounds != bounds:
+            self.index_dirty = True
+        if widget.grabs_pointer():
+            self.grab = widget
+        elif self.grab is widget:
+            self.grab = None
+
+    def dispatch(self, event):
+        """Передает событие мыши нужному виджету.
+
+        Возвращает виджет, получивший событие, или None, если событие
+        не относится к интерфейсу (клавиатура, колесо, клик мимо элементов).
+        """
+        if self.grab is not None and not (self.grab.visible and self.grab in self.widgets):
+            self.grab = None
+
+        if event.type == pygame.MOUSEMOTION:
+            # Кнопку отпустили вне окна - захват больше не нужен
+            if self.capture is not None and not any(event.buttons):
+                self.capture = None
+            hover = self.widget_at(event.pos)
+            receiver = self.grab or self.capture or hover
+            # Виджет, с которого ушел курсор, тоже узнает о движении
+            if self.hover is not None and self.hover is not hover and self.hover is not receiver:
+                self.deliver(self.hover, event)
+            self.hover = hover
+            if receiver is not None:
+                self.deliver(receiver, event)
+            return receiver
+
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button in POINTER_BUTTONS:
+            receiver = self.grab or self.widget_at(event.pos)
+            if receiver is not None:
+                self.capture = receiver
+                self.deliver(receiver, event)
+            return receiver
+
+        if event.type == pygame.MOUSEBUTTONUP and event.button in POINTER_BUTTONS:
+            receiver = self.grab or self.capture or self.widget_at(event.pos)
+            self.capture = None
+            if receiver is not None:
+                self.deliver(receiver, event)
+            return receiver
+
+        return None
@@ -0,0 +1,13 @@
+import pygame
+
+_overlays = {}
+
+
+def dim_overlay(size, alpha):
+    """Полупрозрачное затемнение экрана под диалогом (создается один раз на размер и прозрачность)"""
+    key = (tuple(size), alpha)
+    overlay = _overlays.get(key)
+    if overlay is None:
+        overlay = _overlays[key] = pygame.Surface(size, pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, alpha))
+    return overlay
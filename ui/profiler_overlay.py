@@ -0,0 +1,58 @@
+import pygame
+from ui.text import get_font
+from utils.profiler import PERCENTILES, profiler
+
+# Как часто перестраивается таблица оверлея, мс
+REFRESH_MS = 250
+
+
+class ProfilerOverlay:
+    """Таблица p50/p95/p99 по участкам профилировщика поверх сцены (F3).
+
+    Поверхность таблицы перестраивается не чаще раза в REFRESH_MS, чтобы
+    сам оверлей почти не влиял на замеры. Числа рендерятся шрифтом напрямую,
+    минуя общий кэш надписей, который быстро забился бы меняющимися строками.
+    """
+
+    def __init__(self, x=10, y=50):
+        self.position = (x, y)
+        self.surface = None
+        self.last_refresh = 0
+
+    def build(self):
+        font = get_font(20)
+        color = (230, 240, 255)
+        rows = [("участок, мс", "p50", "p95", "p99")]
+        rows.extend((name, f"{p50:.2f}", f"{p95:.2f}", f"{p99:.2f}")
+                    for name, p50, p95, p99 in profiler.report())
+        rendered = [[font.render(cell, True, color) for cell in row] for row in rows]
+
+        # Первый столбец выравнивается влево, числа - вправо
+        name_width = max(row[0].get_width() for row in rendered)
+        number_width = max(cell.get_width() for row in rendered for cell in row[1:])
+        column_width = number_width + 16
+        line_height = font.get_linesize()
+        width = 20 + name_width + column_width * len(PERCENTILES)
+        height = 10 + line_height * len(rendered)
+
+        surface = pygame.Surface((width, height))
+        surface.fill((20, 24, 32))
+        pygame.draw.rect(surface, (90, 100, 130), surface.get_rect(), 1)
+        for i, row in enumerate(rendered):
+            y = 5 + i * line_height
+            surface.blit(row[0], (10, y))
+            for j, cell in enumerate(row[1:]):
+                right = 10 + name_width + column_width * (j + 1)
+                surface.blit(cell, (right - cell.get_width(), y))
+        return surface
+
+    def draw(self, surface):
+        """Рисует оверлей, возвращает занятую область экрана"""
+        now = pygame.time.get_ticks()
+        if self.surface is None or now - self.last_refresh >= REFRESH_MS:
+            self.surface = self.build()
+            self.last_refresh = now
+        return surface.blit(self.surface, self.position)
+
+    def reset(self):
+        self.surface = None
@@ -1,9 +1,11 @@
 import pygame
+from ui.text import render_text
+from ui.widget import Widget
 
 
-class Slider:
+class Slider(Widget):
     def __init__(self, x, y, width, height, min_val, max_val, initial_val, label=""):
-        self.rect = pygame.Rect(x, y, width, height)
+        super().__init__(x, y, width, height)
         self.min_val = min_val
         self.max_val = max_val
         self.value = initial_val
@@ -35,21 +37,33 @@ class Slider:
     def get_value(self):
         return self.value
 
-    def draw(self, surface):
+    def label_surface(self):
+        return render_text(f"{self.label}: {self.value}", 24, (255, 255, 255))
+
+    @property
+    def bounds(self):
+        # Ползунок выступает за полосу, подпись находится над ней
+        width = max(self.rect.width + 20, self.label_surface().get_width() + 10)
+        return pygame.Rect(self.rect.x - 10, self.rect.y - 25, width, self.rect.height + 30)
+
+    def look_key(self):
+        return self.value, self.dragging, self.label
+
+    def paint(self, surface, origin):
+        rect = self.rect.move(-origin[0], -origin[1])
+
         # Фон слайдера
-        pygame.draw.rect(surface, self.bg_color, self.rect)
+        pygame.draw.rect(surface, self.bg_color, rect)
 
         # Текущее положение
         percent = (self.value - self.min_val) / (self.max_val - self.min_val)
         slider_width = 20
-        slider_x = self.rect.x + percent * self.rect.width - slider_width / 2
-        slider_rect = pygame.Rect(slider_x, self.rect.y - 5, slider_width, self.rect.height + 10)
+        slider_x = rect.x + percent * rect.width - slider_width / 2
+        slider_rect = pygame.Rect(slider_x, rect.y - 5, slider_width, rect.height + 10)
 
         # Рисуем ползунок
         color = self.active_color if self.dragging else self.slider_color
         pygame.draw.rect(surface, color, slider_rect, border_radius=3)
 
         # Текст с значением
-        font = pygame.font.Font(None, 24)
-        value_text = font.render(f"{self.label}: {self.value}", True, (255, 255, 255))
-        surface.blit(value_text, (self.rect.x, self.rect.y - 25))
\ No newline at end of file
+        surface.blit(self.label_surface(), (rect.x, rect.y - 25))
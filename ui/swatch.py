@@ -0,0 +1,31 @@
+import pygame
+from ui.widget import Widget
+
+
+class Swatch(Widget):
+    """Квадратная кнопка-образец (тип тайла или инструмент) с подсветкой выбора"""
+
+    def __init__(self, x, y, width, height, name, color, label="", action=None):
+        super().__init__(x, y, width, height)
+        self.name = name
+        self.color = color
+        self.label = label
+        self.action = action  # вызывается с name при клике
+        self.selected = False
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and self.rect.collidepoint(event.pos):
+            if self.action:
+                self.action(self.name)
+            return True
+        return False
+
+    def look_key(self):
+        return self.selected, self.color
+
+    def paint(self, surface, origin):
+        rect = self.rect.move(-origin[0], -origin[1])
+        pygame.draw.rect(surface, self.color, rect)
+        # Подсветка выбранного элемента
+        if self.selected:
+            pygame.draw.rect(surface, (255, 255, 0), rect, 3)
@@ -0,0 +1,42 @@
+from collections import OrderedDict
+import pygame
+
+# Максимальное число отрисованных надписей в кэше
+TEXT_CACHE_SIZE = 512
+
+_fonts = {}
+_text_cache = OrderedDict()
+
+
+def get_font(size, name=None):
+    """Возвращает общий шрифт заданного размера (создается один раз)"""
+    key = (name, size)
+    font = _fonts.get(key)
+    if font is None:
+        font = _fonts[key] = pygame.font.Font(name, size)
+    return font
+
+
+def render_text(text, size, color, name=None, antialias=True):
+    """Отрисовывает надпись через общий LRU-кэш поверхностей.
+
+    Возвращаемую поверхность нельзя изменять: она может использоваться
+    повторно в других местах.
+    """
+    key = (name, size, text, tuple(color), antialias)
+    surface = _text_cache.get(key)
+    if surface is not None:
+        _text_cache.move_to_end(key)
+        return surface
+
+    surface = get_font(size, name).render(text, antialias, color)
+    _text_cache[key] = surface
+    if len(_text_cache) > TEXT_CACHE_SIZE:
+        _text_cache.popitem(last=False)
+    return surface
+
+
+def clear_text_cache():
+    """Очищает кэш шрифтов и надписей (например, после pygame.quit)"""
+    _fonts.clear()
+    _text_cache.clear()
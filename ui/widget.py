@@ -0,0 +1,69 @@
+import pygame
+
+# Сколько вариантов внешнего вида хранить на один виджет
+MAX_LOOKS = 16
+
+
+class Widget:
+    """Базовый элемент интерфейса с кэшем внешнего вида.
+
+    Внешний вид описывается ключом look_key(): пока ключ не меняется,
+    виджет не перерисовывается, а готовая поверхность берется из кэша.
+    Наследники реализуют look_key() и paint(surface, origin).
+    """
+
+    def __init__(self, x, y, width, height):
+        self.rect = pygame.Rect(x, y, width, height)
+        self.visible = True
+        self.z_index = 0
+        self.looks = {}
+
+    @property
+    def bounds(self):
+        """Область экрана, которую занимает виджет (может быть больше rect)"""
+        return self.rect
+
+    @property
+    def hit_rect(self):
+        """Область, реагирующая на мышь (должна лежать внутри bounds)"""
+        return self.rect
+
+    def grabs_pointer(self):
+        """True, пока виджет должен получать все события мыши (например, открытый список)"""
+        return False
+
+    def layer_order(self):
+        """Порядок наложения внутри слоя интерфейса: (признак «поверх всех», z_index)"""
+        return 0, self.z_index
+
+    def look_key(self):
+        """Хешируемое описание текущего внешнего вида"""
+        return None
+
+    def paint(self, surface, origin):
+        """Рисует виджет на surface, где origin - экранные координаты ее угла"""
+        raise NotImplementedError
+
+    def get_look(self):
+        """Возвращает (поверхность, позиция) для текущего состояния, рисуя при промахе кэша"""
+        bounds = self.bounds
+        key = (self.look_key(), bounds.size)
+        look = self.looks.get(key)
+        if look is None:
+            if len(self.looks) >= MAX_LOOKS:
+                self.looks.clear()
+            look = pygame.Surface(bounds.size, pygame.SRCALPHA)
+            self.paint(look, bounds.topleft)
+            self.looks[key] = look
+        return look, bounds.topleft
+
+    def invalidate(self):
+        """Сбрасывает кэш внешнего вида (например, после смены цветов)"""
+        self.looks.clear()
+
+    def handle_event(self, event):
+        return False
+
+    def draw(self, surface):
+        look, position = self.get_look()
+        surface.blit(look, position)
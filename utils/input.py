@@ -0,0 +1,68 @@
+import pygame
+
+
+class InputLayer:
+    """Слой ввода между Game.run и сценами.
+
+    Склеивает подряд идущие MOUSEMOTION в одно событие с полем samples
+    (список всех позиций курсора по порядку). Нажатия кнопок, клавиш и
+    колесика сохраняют свой порядок относительно движений.
+
+    Каждое событие получает поле time - время кадра в мс. Сцены и виджеты
+    берут время отсюда, а не из часов, поэтому запись ввода воспроизводится
+    одинаково при любой скорости (см. utils.replay).
+    """
+
+    def __init__(self):
+        # None - положение курсора неизвестно или он вне окна
+        self.mouse_pos = None
+        self.mouse_buttons = (False, False, False)
+        self.time = 0  # Время текущего кадра, мс
+
+    def process(self, events, now=None):
+        """Возвращает список событий кадра со склеенными движениями мыши.
+
+        now - время кадра в мс (по умолчанию pygame.time.get_ticks()).
+        """
+        self.time = pygame.time.get_ticks() if now is None else now
+        result = []
+        motion = None
+
+        for event in events:
+            if event.type == pygame.MOUSEMOTION:
+                if motion is None:
+                    motion = {
+                        'pos': event.pos,
+                        'rel': event.rel,
+                        'buttons': event.buttons,
+                        'samples': [event.pos]
+                    }
+                else:
+                    motion['pos'] = event.pos
+                    motion['rel'] = (motion['rel'][0] + event.rel[0], motion['rel'][1] + event.rel[1])
+                    motion['buttons'] = event.buttons
+                    motion['samples'].append(event.pos)
+                self.mouse_pos = event.pos
+                self.mouse_buttons = tuple(bool(button) for button in event.buttons[:3])
+                continue
+
+            if motion is not None:
+                result.append(pygame.event.Event(pygame.MOUSEMOTION, motion, time=self.time))
+                motion = None
+
+            if event.type == pygame.WINDOWLEAVE:
+                self.mouse_pos = None
+            elif event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+                self.mouse_pos = event.pos
+                if 1 <= event.button <= 3:
+                    buttons = list(self.mouse_buttons)
+                    buttons[event.button - 1] = event.type == pygame.MOUSEBUTTONDOWN
+                    self.mouse_buttons = tuple(buttons)
+
+            event.time = self.time
+            result.append(event)
+
+        if motion is not None:
+            result.append(pygame.event.Event(pygame.MOUSEMOTION, motion, time=self.time))
+
+        return result
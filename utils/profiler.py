@@ -0,0 +1,123 @@
+from collections import deque
+import functools
+import time
+
+# Сколько последних замеров хранится для каждого участка
+HISTORY_SIZE = 240
+PERCENTILES = (50, 95, 99)
+
+
+class NullSpan:
+    """Пустой участок: возвращается, пока профилировщик выключен"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    """Замер одного участка кода (with profiler.span("имя"): ...)"""
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.profiler.finish(self.name, self.start, time.perf_counter())
+        return False
+
+
+class Profiler:
+    """Профилировщик кадра: скользящие истории длительностей по участкам.
+
+    Пока профилировщик выключен и к нему не подключен трассировщик,
+    span() возвращает общий пустой объект и ничего не измеряет, поэтому
+    точки замера можно оставлять в горячем коде.
+    """
+
+    def __init__(self, history=HISTORY_SIZE):
+        self.enabled = False
+        self.tracer = None  # utils.tracing.Tracer, получающий каждый участок
+        self.active = False  # enabled или подключен трассировщик
+        self.history = history
+        self.samples = {}  # имя участка -> deque длительностей в мс
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        if not self.enabled:
+            self.reset()
+        self.active = self.enabled or self.tracer is not None
+        return self.enabled
+
+    def set_tracer(self, tracer):
+        """Подключает (или отключает при None) запись участков в трассировку"""
+        self.tracer = tracer
+        self.active = self.enabled or self.tracer is not None
+
+    def reset(self):
+        self.samples.clear()
+
+    def span(self, name):
+        if not self.active:
+            return NULL_SPAN
+        return Span(self, name)
+
+    def finish(self, name, start, end):
+        """Завершение участка: время по perf_counter в секундах"""
+        if self.enabled:
+            self.record(name, end - start)
+        if self.tracer is not None:
+            self.tracer.add(name, start, end)
+
+    def record(self, name, seconds):
+        """Добавляет замер участка name (в секундах)"""
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.history)
+        samples.append(seconds * 1000.0)
+
+    def percentiles(self, name):
+        """(p50, p95, p99) участка в миллисекундах или None, если замеров нет"""
+        samples = self.samples.get(name)
+        if not samples:
+            return None
+        values = sorted(samples)
+        last = len(values) - 1
+        return tuple(values[min(last, len(values) * p // 100)] for p in PERCENTILES)
+
+    def report(self):
+        """Список (имя, p50, p95, p99) по всем участкам, отсортированный по имени"""
+        rows = []
+        for name in sorted(self.samples):
+            stats = self.percentiles(name)
+            if stats is not None:
+                rows.append((name,) + stats)
+        return rows
+
+
+# Общий профилировщик игры
+profiler = Profiler()
+
+
+def profiled(name):
+    """Декоратор: замеряет каждый вызов функции как участок name"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.active:
+                return func(*args, **kwargs)
+            with Span(profiler, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
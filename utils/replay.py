@@ -0,0 +1,175 @@
+import json
+import time
+import pygame
+
+REPLAY_FORMAT = "selectown-replay"
+REPLAY_VERSION = 1
+
+# Записываемые события: то, на что реагируют сцены
+RECORDED_TYPES = {
+    pygame.event.event_name(event_type): event_type
+    for event_type in (
+        pygame.QUIT,
+        pygame.KEYDOWN,
+        pygame.KEYUP,
+        pygame.TEXTINPUT,
+        pygame.MOUSEMOTION,
+        pygame.MOUSEBUTTONDOWN,
+        pygame.MOUSEBUTTONUP,
+        pygame.MOUSEWHEEL,
+        pygame.WINDOWENTER,
+        pygame.WINDOWLEAVE,
+    )
+}
+RECORDED_TYPE_IDS = set(RECORDED_TYPES.values())
+
+
+def encode_event(event):
+    """Событие -> [имя типа, атрибуты] (только значения, представимые в JSON)"""
+    attributes = {}
+    for key, value in event.dict.items():
+        if key == 'time':
+            continue  # Время кадра хранится в записи отдельно
+        if isinstance(value, (bool, int, float, str)):
+            attributes[key] = value
+        elif isinstance(value, (tuple, list)) and all(isinstance(item, (int, float)) for item in value):
+            attributes[key] = list(value)
+    return [pygame.event.event_name(event.type), attributes]
+
+
+def decode_event(data):
+    """[имя типа, атрибуты] -> pygame.event.Event (списки снова становятся кортежами)"""
+    name, attributes = data
+    attributes = {key: tuple(value) if isinstance(value, list) else value
+                  for key, value in attributes.items()}
+    return pygame.event.Event(RECORDED_TYPES[name], attributes)
+
+
+class Recorder:
+    """Запись потока событий Game.run в файл JSON Lines.
+
+    Первая строка - заголовок (формат, разрешение, частота симуляции),
+    дальше по строке на каждый кадр с событиями: номер кадра, время кадра
+    в мс (как у InputLayer.time), длительность кадра и сами события.
+    Кадры без событий не пишутся - при воспроизведении они восстанавливаются
+    по номерам.
+    """
+
+    def __init__(self, path, game):
+        # Загрузка и сохранение карты не должны зависеть от скорости потоков,
+        # иначе запись не совпадет с воспроизведением
+        game.sync_jobs = True
+        self.path = path
+        self.file = open(path, "w")
+        self.frame = 0
+        self.write({
+            "format": REPLAY_FORMAT,
+            "version": REPLAY_VERSION,
+            "resolution": list(game.screen.get_size()),
+            "tick_rate": game.timestep.tick_rate
+        })
+
+    def write(self, data):
+        self.file.write(json.dumps(data, ensure_ascii=False) + "\n")
+
+    def record(self, events, now, frame_time):
+        """Записывает сырые события одного кадра"""
+        events = [encode_event(event) for event in events if event.type in RECORDED_TYPE_IDS]
+        if events:
+            self.write({"frame": self.frame, "t": now, "dt": round(frame_time, 6), "events": events})
+        self.frame += 1
+
+    def close(self):
+        if self.file is not None:
+            self.write({"end": self.frame})
+            self.file.close()
+            self.file = None
+            print(f"Запись ввода сохранена: {self.path} (кадров: {self.frame})")
+
+
+def load_recording(path):
+    """Читает запись: возвращает (заголовок, {кадр: (время, события)}, число кадров)"""
+    with open(path, "r") as f:
+        header = json.loads(f.readline())
+        if header.get("format") != REPLAY_FORMAT:
+            raise ValueError(f"{path}: это не запись ввода Selectown")
+        if header.get("version", 0) > REPLAY_VERSION:
+            raise ValueError(f"{path}: неподдерживаемая версия записи {header['version']}")
+
+        frames = {}
+        frame_count = 0
+        for line in f:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            if "end" in data:
+                frame_count = data["end"]
+                continue
+            frames[data["frame"]] = (data["t"], [decode_event(event) for event in data["events"]])
+            frame_count = max(frame_count, data["frame"] + 1)
+    return header, frames, frame_count
+
+
+def replay(game, path, dt=None):
+    """Проигрывает запись на сценах игры без ожидания, кадр за кадром.
+
+    Каждый кадр получает фиксированный шаг dt (по умолчанию шаг симуляции
+    игры) и время кадра из записи, поэтому воспроизведение детерминировано.
+    Возвращает список длительностей кадров в мс.
+    """
+    header, frames, frame_count = load_recording(path)
+    step = game.timestep.step if dt is None else dt
+    # Воспроизведение не пишет и не видит журналы автосохранения пользователя
+    game.autosave_dir = None
+    game.sync_jobs = True
+
+    # Раскладка интерфейса зависит от размера экрана - берем его из записи
+    resolution = header.get("resolution")
+    if resolution and list(game.screen.get_size()) != resolution:
+        game.settings["resolution"] = resolution
+        game.init_screen()
+        game.init_scenes()
+
+    game.change_scene("main_menu")
+    frame_times = []
+    now = 0
+    for frame in range(frame_count):
+        if frame in frames:
+            now, events = frames[frame]
+        else:
+            events = []
+            now += round(step * 1000)
+
+        # Одинаковое число шагов симуляции на кадр при любом dt
+        game.timestep.reset()
+        start = time.perf_counter()
+        game.step(events, step, now)
+        frame_times.append((time.perf_counter() - start) * 1000.0)
+        if not game.running:
+            break
+
+    # Сцена завершается, как и в Game.run
+    if game.current_scene:
+        game.current_scene.on_exit()
+    return frame_times
+
+
+def frame_time_report(frame_times):
+    """Сводка распределения длительностей кадров (мс)"""
+    if not frame_times:
+        return {"frames": 0}
+    values = sorted(frame_times)
+    last = len(values) - 1
+
+    def percentile(p):
+        return round(values[min(last, len(values) * p // 100)], 3)
+
+    return {
+        "frames": len(values),
+        "total_ms": round(sum(values), 3),
+        "mean_ms": round(sum(values) / len(values), 3),
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+        "max_ms": round(values[-1], 3)
+    }
@@ -8,7 +8,9 @@ def load_settings():
         "resolution": [1280, 720],
         "fullscreen": False,
         "music_volume": 0.8,
-        "sfx_volume": 1.0
+        "sfx_volume": 1.0,
+        "tick_rate": 60,  # Шагов симуляции в секунду
+        "max_fps": 60  # Ограничение частоты кадров (0 - без ограничения)
     }
 
     try:
@@ -0,0 +1,49 @@
+class FixedTimestep:
+    """Аккумулятор времени для симуляции с фиксированным шагом.
+
+    Время кадров копится в accumulator и расходуется целыми шагами step,
+    поэтому update сцен всегда получает одинаковый dt независимо от
+    частоты отрисовки. Остаток шага (alpha) используется при отрисовке для
+    интерполяции между двумя последними состояниями.
+
+    Чтобы медленные кадры не раскручивали «спираль смерти», время одного
+    кадра ограничено max_frame_time, а число шагов за кадр - max_steps;
+    не успевшее время отбрасывается (счетчик dropped_time).
+    """
+
+    def __init__(self, tick_rate=60, max_steps=5, max_frame_time=0.25):
+        self.tick_rate = tick_rate
+        self.step = 1.0 / tick_rate
+        self.max_steps = max_steps
+        self.max_frame_time = max_frame_time
+        self.accumulator = 0.0
+        self.ticks = 0  # Всего выполненных шагов
+        self.dropped_time = 0.0  # Сколько времени симуляции пропущено из-за перегрузки
+
+    def advance(self, frame_time):
+        """Добавляет время кадра (в секундах), возвращает число шагов симуляции"""
+        if frame_time > self.max_frame_time:
+            self.dropped_time += frame_time - self.max_frame_time
+            frame_time = self.max_frame_time
+        self.accumulator += frame_time
+
+        steps = int(self.accumulator // self.step)
+        if steps > self.max_steps:
+            self.dropped_time += (steps - self.max_steps) * self.step
+            steps = self.max_steps
+            # Остаток не больше одного шага, иначе отставание копится
+            self.accumulator = min(self.accumulator - steps * self.step, self.step * 0.999)
+        else:
+            self.accumulator -= steps * self.step
+
+        self.ticks += steps
+        return steps
+
+    @property
+    def alpha(self):
+        """Доля следующего шага, уже прошедшая к моменту отрисовки (0..1)"""
+        return self.accumulator / self.step
+
+    def reset(self):
+        """Сбрасывает накопленное время (после паузы или ожидания событий)"""
+        self.accumulator = 0.0
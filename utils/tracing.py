@@ -0,0 +1,97 @@
+from collections import deque
+import csv
+import json
+import threading
+import time
+
+# Сколько последних участков хранит трассировщик по умолчанию
+DEFAULT_CAPACITY = 100000
+
+
+class Tracer:
+    """Запись участков кода в кольцевой буфер для экспорта в Chrome trace.
+
+    Каждый участок хранится кортежем (имя, начало, длительность, поток) и
+    превращается в событие формата Trace Event («ph»: «X») только при
+    экспорте. Буфер ограничен capacity: при переполнении вытесняются самые
+    старые участки, поэтому долгая сессия не съедает память.
+
+    Файл JSON открывается в Perfetto (ui.perfetto.dev) или chrome://tracing.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.events = deque(maxlen=capacity)
+        self.origin = time.perf_counter()
+        self.total = 0  # Всего записанных участков, включая вытесненные
+
+    @property
+    def dropped(self):
+        return self.total - len(self.events)
+
+    def add(self, name, start, end):
+        """Добавляет участок; start и end - время по perf_counter в секундах"""
+        self.events.append((name, start, end - start, threading.get_ident()))
+        self.total += 1
+
+    def chrome_events(self):
+        """События в формате Chrome Trace Event (время в микросекундах)"""
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        result = []
+        threads = set()
+        for name, start, duration, thread_id in self.events:
+            threads.add(thread_id)
+            result.append({
+                "name": name,
+                "cat": name.split('.', 1)[0],
+                "ph": "X",
+                "ts": round((start - self.origin) * 1e6, 3),
+                "dur": round(duration * 1e6, 3),
+                "pid": 1,
+                "tid": thread_id
+            })
+        result.sort(key=lambda event: event["ts"])
+
+        # Имена потоков для просмотрщика
+        for thread_id in sorted(threads):
+            result.append({
+                "name": "thread_name",
+                "ph": "M",
+                "pid": 1,
+                "tid": thread_id,
+                "args": {"name": thread_names.get(thread_id, f"thread-{thread_id}")}
+            })
+        return result
+
+    def save_json(self, path):
+        """Сохраняет трассировку в JSON-файл формата Chrome trace"""
+        data = {
+            "traceEvents": self.chrome_events(),
+            "displayTimeUnit": "ms",
+            "otherData": {"game": "Selectown", "dropped_spans": self.dropped}
+        }
+        with open(path, "w") as f:
+            json.dump(data, f)
+        print(f"Трассировка сохранена: {path} (участков: {len(self.events)}, вытеснено: {self.dropped})")
+
+    def summary(self):
+        """Сводка по участкам: (имя, число, всего мс, среднее, p95, максимум)"""
+        durations = {}
+        for name, _, duration, _ in self.events:
+            durations.setdefault(name, []).append(duration * 1000.0)
+
+        rows = []
+        for name in sorted(durations):
+            values = sorted(durations[name])
+            total = sum(values)
+            p95 = values[min(len(values) - 1, len(values) * 95 // 100)]
+            rows.append((name, len(values), total, total / len(values), p95, values[-1]))
+        return rows
+
+    def save_csv(self, path):
+        """Сохраняет сводку по участкам в CSV"""
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["name", "count", "total_ms", "mean_ms", "p95_ms", "max_ms"])
+            for name, count, total, mean, p95, maximum in self.summary():
+                writer.writerow([name, count, f"{total:.3f}", f"{mean:.3f}", f"{p95:.3f}", f"{maximum:.3f}"])
+        print(f"Сводка трассировки сохранена: {path}")
@@ -0,0 +1,82 @@
+import functools
+import math
+
+
+class BrushMask:
+    """Форма кисти, разложенная на горизонтальные отрезки относительно центра.
+
+    Каждый отрезок - кортеж (dy, dx0, dx1), где dx1 не включается.
+    """
+
+    def __init__(self, spans):
+        self.spans = tuple(spans)
+        if self.spans:
+            self.min_dx = min(span[1] for span in self.spans)
+            self.max_dx = max(span[2] for span in self.spans) - 1
+            self.min_dy = min(span[0] for span in self.spans)
+            self.max_dy = max(span[0] for span in self.spans)
+        else:
+            self.min_dx = self.max_dx = self.min_dy = self.max_dy = 0
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Создает маску из произвольной формы.
+
+        rows - список строк ('#' или любой символ кроме ' ' и '.' - закрашено)
+        либо список последовательностей булевых значений. Центр формы -
+        ячейка (ширина // 2, высота // 2).
+        """
+        rows = [[cell not in (' ', '.') if isinstance(cell, str) else bool(cell) for cell in row]
+                for row in rows]
+        center_y = len(rows) // 2
+        center_x = max((len(row) for row in rows), default=0) // 2
+
+        spans = []
+        for y, row in enumerate(rows):
+            start = None
+            for x, filled in enumerate(row + [False]):
+                if filled and start is None:
+                    start = x
+                elif not filled and start is not None:
+                    spans.append((y - center_y, start - center_x, x - center_x))
+                    start = None
+        return cls(spans)
+
+    def cells(self):
+        """Перебирает смещения (dx, dy) всех закрашенных ячеек"""
+        for dy, dx0, dx1 in self.spans:
+            for dx in range(dx0, dx1):
+                yield dx, dy
+
+    def __len__(self):
+        return sum(dx1 - dx0 for _, dx0, dx1 in self.spans)
+
+
+@functools.lru_cache(maxsize=None)
+def disk_mask(radius):
+    """Круглая кисть: ячейки с dx*dx + dy*dy <= radius*radius"""
+    radius_squared = radius * radius
+    spans = []
+    for dy in range(-radius, radius + 1):
+        half = math.isqrt(radius_squared - dy * dy)
+        spans.append((dy, -half, half + 1))
+    return BrushMask(spans)
+
+
+@functools.lru_cache(maxsize=None)
+def square_mask(radius):
+    """Квадратная кисть со стороной 2 * radius + 1"""
+    return BrushMask((dy, -radius, radius + 1) for dy in range(-radius, radius + 1))
+
+
+BRUSH_SHAPES = {
+    'disk': disk_mask,
+    'square': square_mask,
+}
+
+
+def get_mask(shape, radius):
+    """Возвращает кэшированную маску кисти заданной формы и радиуса"""
+    if isinstance(shape, BrushMask):
+        return shape
+    return BRUSH_SHAPES[shape](radius)
@@ -0,0 +1,227 @@
+import json
+import os
+import queue
+import threading
+import time
+from world.map import CHUNK_SIZE, Map
+from world.mapfile import (DEFAULT_CHUNK_CACHE, LEGACY_EXTENSION, MapSnapshot, chunk_count,
+                           open_map_file, read_chunks, read_header)
+from world.tiles import TileRegistry, default_registry
+
+# Сколько чанков поток загрузки передает одним сообщением
+LOAD_BATCH = 64
+# Сколько секунд кадра можно тратить на перенос пришедших чанков в карту
+LOAD_POLL_BUDGET = 0.004
+
+
+class SaveJob:
+    """Сохранение карты в фоновом потоке.
+
+    Снимок карты берется сразу в конструкторе (в главном потоке), сжатие и
+    запись временного файла идут в потоке, а замена файла и снятие пометок
+    с карты - в главном потоке при poll(), когда поток закончил работу.
+    Пока идет сохранение, карту можно свободно редактировать.
+
+    copy=True записывает копию карты (для автосохранения): флаги изменений
+    не снимаются, а ленивая карта продолжает читать свой исходный файл.
+    """
+
+    def __init__(self, game_map, path, copy=False):
+        self.map = game_map
+        self.path = path
+        self.copy = copy
+        self.temp_path = path + ".tmp"
+        self.snapshot = MapSnapshot(game_map)
+        self.progress = 0.0
+        self.error = None
+        self.finished = False
+        self.thread = threading.Thread(target=self.run, name="map-save", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        try:
+            self.snapshot.write(self.temp_path, self.set_progress)
+        except Exception as e:
+            self.error = e
+
+    def set_progress(self, value):
+        self.progress = value
+
+    def poll(self, can_commit=True):
+        """Завершает сохранение, если поток закончил; возвращает True, когда работа завершена.
+
+        Пока can_commit ложно, замена файла откладывается (например, пока
+        исходный файл ленивой карты читает другой фоновый снимок).
+        """
+        if self.finished:
+            return True
+        if self.thread.is_alive() or not can_commit:
+            return False
+
+        self.finished = True
+        if self.error is None:
+            try:
+                if not self.copy:
+                    self.snapshot.commit(self.map, self.temp_path, self.path)
+                    return True
+                os.replace(self.temp_path, self.path)
+            except OSError as e:
+                self.error = e
+        self.snapshot.release(self.map)
+        return True
+
+    def wait(self):
+        """Дожидается окончания сохранения (например, при выходе из редактора)"""
+        self.thread.join()
+        return self.poll()
+
+
+class LoadJob:
+    """Загрузка карты в фоновом потоке с передачей чанков через очередь.
+
+    Поток читает файл и кладет в очередь сообщения: заголовок, пачки
+    распакованных чанков и признак окончания (или ошибку). Главный поток в
+    poll() строит по заголовку карту и переносит в нее пришедшие чанки,
+    поэтому уже загруженную часть можно показывать до конца загрузки.
+
+    Карты .smap больше кэша чанков открываются лениво (open_map_file) -
+    это не зависит от размера, и поток сразу отдает готовую карту.
+    """
+
+    def __init__(self, path, lazy_chunks=DEFAULT_CHUNK_CACHE):
+        self.path = path
+        self.lazy_chunks = lazy_chunks
+        self.queue = queue.Queue()
+        self.cancelled = threading.Event()
+        self.map = None  # Карта появляется после заголовка и заполняется по мере загрузки
+        self.count = 0
+        self.loaded = 0
+        self.error = None
+        self.finished = False
+        self.thread = threading.Thread(target=self.run, name="map-load", daemon=True)
+
+    @property
+    def progress(self):
+        return self.loaded / self.count if self.count else 0.0
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        """Прерывает загрузку; уже прочитанное отбрасывается"""
+        self.cancelled.set()
+        self.finished = True
+        self.map = None
+
+    def run(self):
+        try:
+            if self.path.endswith(LEGACY_EXTENSION):
+                self.read_json()
+            else:
+                self.read_smap()
+        except Exception as e:
+            self.queue.put(("error", e))
+
+    def read_smap(self):
+        with open(self.path, "rb") as f:
+            header = read_header(f)
+            count = chunk_count(header["width"], header["height"])
+            if count > self.lazy_chunks:
+                self.queue.put(("map", open_map_file(self.path)))
+                return
+
+            self.queue.put(("header", header))
+            batch = []
+            for index, tiles in read_chunks(f, count):
+                if self.cancelled.is_set():
+                    return
+                batch.append((index, tiles))
+                if len(batch) == LOAD_BATCH:
+                    self.queue.put(("chunks", batch))
+                    batch = []
+            self.queue.put(("chunks", batch))
+        self.queue.put(("done", None))
+
+    def read_json(self):
+        """Старый формат: разбор JSON целиком, затем чанки по полосам строк"""
+        with open(self.path, "r") as f:
+            map_info = json.load(f)
+        if self.cancelled.is_set():
+            return
+
+        size = map_info['size']
+        default_tile = map_info.get('default_tile', 'grass')
+        rows = map_info['tiles'][:size]
+
+        # Палитра: стандартные типы и все встреченные в файле
+        registry = default_registry()
+        default_id = registry.get_id(default_tile)
+        for row in rows:
+            for name in set(row):
+                registry.get_id(name)
+        self.queue.put(("header", {"width": size, "height": size, "default_tile": default_tile,
+                                   "palette": list(registry.names)}))
+
+        ids = registry.ids
+        chunks_x = (size + CHUNK_SIZE - 1) // CHUNK_SIZE
+        row_length = chunks_x * CHUNK_SIZE
+        empty_row = bytes([default_id]) * row_length
+        fill = bytes([default_id])
+        for cy in range(chunks_x):  # Карта квадратная
+            if self.cancelled.is_set():
+                return
+            band = [bytes(ids[name] for name in row[:size]).ljust(row_length, fill)
+                    for row in rows[cy * CHUNK_SIZE:(cy + 1) * CHUNK_SIZE]]
+            band.extend([empty_row] * (CHUNK_SIZE - len(band)))
+            self.queue.put(("chunks", [
+                (cy * chunks_x + cx, bytearray(b''.join(row[cx * CHUNK_SIZE:(cx + 1) * CHUNK_SIZE] for row in band)))
+                for cx in range(chunks_x)
+            ]))
+        self.queue.put(("done", None))
+
+    def poll(self, budget=LOAD_POLL_BUDGET):
+        """Переносит пришедшие чанки в карту, тратя не больше budget секунд.
+
+        Вызывается в главном потоке; возвращает True, когда загрузка
+        закончилась (успешно, с ошибкой в error или отменой).
+        """
+        deadline = time.perf_counter() + budget
+        while not self.finished and time.perf_counter() < deadline:
+            try:
+                kind, data = self.queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "header":
+                # ID чанков в палитре файла - реестр карты строится по ней же
+                self.map = Map(data["width"], data["height"], data["default_tile"],
+                               TileRegistry(data["palette"]))
+                self.count = len(self.map.chunks)
+            elif kind == "chunks":
+                game_map = self.map
+                game_map.version += 1
+                for index, tiles in data:
+                    chunk = game_map.chunks[index]
+                    chunk.tiles = tiles
+                    chunk.version = game_map.version
+                self.loaded += len(data)
+            elif kind == "map":
+                self.map = data
+                self.count = self.loaded = len(data.chunks)
+                self.finished = True
+            elif kind == "done":
+                self.finished = True
+            elif kind == "error":
+                self.error = data
+                self.map = None
+                self.finished = True
+        return self.finished
+
+    def wait(self):
+        """Дожидается конца загрузки и переносит в карту все чанки сразу"""
+        self.thread.join()
+        return self.poll(budget=float('inf'))
@@ -0,0 +1,375 @@
+"""Журнал правок карты для восстановления после сбоя (автосохранение).
+
+Каждый журнал ведется в своей папке сессии внутри AUTOSAVE_DIR, поэтому
+несколько запущенных редакторов не мешают друг другу:
+
+    session-<время>-<pid>/
+        lock             захвачен, пока сессия жива
+        journal-N.log    правки после основы журнала
+        snapshot-N.smap  снимок карты - основа журнала N (формат world.mapfile)
+
+Папка с журналами и свободным lock осталась от сбоя; она удаляется только
+после восстановления карты или явного отказа от нее (discard_session).
+
+Журнал начинается с заголовка (MAGIC, версия, JSON с описанием основы:
+новая карта, файл карты или снимок), дальше идут записи: длина и CRC32
+тела, затем операция, ID тайла и данные. Запись, оборванная сбоем,
+отбрасывается по длине или CRC.
+
+Когда журнал становится больше последнего снимка, карта в фоне сжимается в
+новый снимок, а правки пишутся уже в следующий журнал. Старые файлы
+удаляются только после записи снимка, поэтому на диске всегда есть полный
+набор для восстановления, а объем записи растет с числом правок, а не с
+размером карты.
+"""
+import json
+import os
+import shutil
+import struct
+import time
+import zlib
+from world.jobs import SaveJob
+from world.map import Map
+from world.mapfile import MapSnapshot, open_map_file
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+AUTOSAVE_DIR = os.path.join("maps", "autosave")
+SESSION_PREFIX = "session-"
+LOCK_NAME = "lock"
+
+JOURNAL_MAGIC = b"SJRN"
+JOURNAL_VERSION = 1
+JOURNAL_HEADER = struct.Struct("<4sHH")  # MAGIC, версия, длина описания основы
+RECORD_HEADER = struct.Struct("<II")  # длина тела, CRC32 тела
+RECORD_PREFIX = struct.Struct("<BB")  # операция, ID тайла
+RECT = struct.Struct("<IIII")  # x, y, ширина, высота
+SPAN = struct.Struct("<III")  # y, x0, x1
+FILL = struct.Struct("<IIB")  # x, y, ID заменяемого тайла
+
+# Журнал меньше этого размера не сжимается, даже если снимок еще меньше
+MIN_COMPACT_BYTES = 64 * 1024
+
+OP_NAME = 0  # Имя тайла для ID; пишется перед первой правкой с этим ID
+OP_RECT = 1
+OP_SPANS = 2
+OP_FILL = 3
+OPS = {'rect': OP_RECT, 'spans': OP_SPANS, 'fill': OP_FILL}
+
+
+class JournalError(ValueError):
+    """Журнал поврежден или для него нет основы"""
+
+
+def journal_path(directory, generation):
+    return os.path.join(directory, f"journal-{generation}.log")
+
+
+def snapshot_path(directory, generation):
+    return os.path.join(directory, f"snapshot-{generation}.smap")
+
+
+def lock_file(f):
+    """Захватывает открытый файл без ожидания; False, если он захвачен другим владельцем"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def session_alive(directory):
+    """Ведет ли журнал в папке сессии запущенный редактор"""
+    try:
+        with open(os.path.join(directory, LOCK_NAME), "ab") as f:
+            # Захват освобождается при закрытии файла
+            return not lock_file(f)
+    except OSError:
+        return False
+
+
+def list_generations(directory):
+    """Номера журналов в папке по возрастанию"""
+    if not os.path.isdir(directory):
+        return []
+    generations = []
+    for name in os.listdir(directory):
+        if name.startswith("journal-") and name.endswith(".log"):
+            try:
+                generations.append(int(name[len("journal-"):-len(".log")]))
+            except ValueError:
+                pass
+    return sorted(generations)
+
+
+def crashed_sessions(root=AUTOSAVE_DIR):
+    """Папки сессий, оставшиеся после сбоя, от старых к новым"""
+    if root is None or not os.path.isdir(root):
+        return []
+    sessions = []
+    for name in sorted(os.listdir(root)):
+        directory = os.path.join(root, name)
+        if (name.startswith(SESSION_PREFIX) and list_generations(directory)
+                and not session_alive(directory)):
+            sessions.append(directory)
+    return sessions
+
+
+def has_journal(root=AUTOSAVE_DIR):
+    """Остался ли журнал после сбоя (при нормальном выходе он удаляется)"""
+    return bool(crashed_sessions(root))
+
+
+def discard_session(directory):
+    """Удаляет файлы сессии (после восстановления или отказа от него)"""
+    # Снимок может быть еще открыт ленивой картой - тогда он остается до следующей попытки
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def new_map_base(game_map):
+    """Основа журнала - новая пустая карта"""
+    return {"kind": "new", "width": game_map.width, "height": game_map.height,
+            "default_tile": game_map.default_tile}
+
+
+def file_base(path):
+    """Основа журнала - файл карты; годится, пока файл не изменился"""
+    stat = os.stat(path)
+    return {"kind": "file", "path": path, "mtime": stat.st_mtime_ns, "size": stat.st_size}
+
+
+class EditJournal:
+    """Журнал правок одной карты: подписывается на Map.listeners.
+
+    base - основа журнала (new_map_base или file_base); при None основой
+    становится снимок текущей карты (например, только что восстановленной).
+    Файлы пишутся в новую папку сессии внутри root и удаляются только свои.
+
+    update() вызывается раз в кадр: сбрасывает записи в файл и ведет сжатие.
+    """
+
+    def __init__(self, game_map, base=None, root=AUTOSAVE_DIR):
+        self.map = game_map
+        self.directory = os.path.join(root, f"{SESSION_PREFIX}{time.time_ns()}-{os.getpid()}")
+        os.makedirs(self.directory)
+        self.lock = open(os.path.join(self.directory, LOCK_NAME), "wb")
+        lock_file(self.lock)
+        self.generation = 0
+        self.file = None
+        self.size = 0  # Байт правок в текущем журнале
+        self.snapshot_size = 0
+        self.names = set()  # ID тайлов, имена которых уже записаны в текущий журнал
+        self.job = None  # Идущее сжатие (world.jobs.SaveJob)
+
+        if base is None:
+            path = snapshot_path(self.directory, self.generation)
+            snapshot = MapSnapshot(game_map)
+            try:
+                snapshot.write(path + ".tmp")
+            finally:
+                snapshot.release(game_map)
+            os.replace(path + ".tmp", path)
+            self.snapshot_size = os.path.getsize(path)
+            base = {"kind": "snapshot"}
+
+        self.open_journal(base)
+        game_map.listeners.append(self.record)
+
+    @property
+    def compacting(self):
+        """Идет ли фоновое сжатие (снимок читает карту и ее исходный файл)"""
+        return self.job is not None
+
+    def open_journal(self, base):
+        data = json.dumps(base).encode("utf-8")
+        self.file = open(journal_path(self.directory, self.generation), "wb")
+        self.file.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, len(data)) + data)
+        self.file.flush()
+        self.size = 0
+        self.names.clear()
+
+    def append(self, op, tile_id, payload):
+        body = RECORD_PREFIX.pack(op, tile_id) + payload
+        self.file.write(RECORD_HEADER.pack(len(body), zlib.crc32(body)) + body)
+        self.size += RECORD_HEADER.size + len(body)
+
+    def declare(self, tile_id):
+        if tile_id not in self.names:
+            self.names.add(tile_id)
+            self.append(OP_NAME, tile_id, self.map.registry.names[tile_id].encode("utf-8"))
+
+    def record(self, op, tile_id, data):
+        """Слушатель Map: дописывает правку в журнал"""
+        self.declare(tile_id)
+        if op == 'rect':
+            payload = RECT.pack(*data)
+        elif op == 'spans':
+            payload = b"".join([SPAN.pack(*span) for span in data])
+        else:
+            self.declare(data[2])
+            payload = FILL.pack(*data)
+        self.append(OPS[op], tile_id, payload)
+
+    def update(self, can_compact=True):
+        """Раз в кадр: сбрасывает записи на диск и начинает или завершает сжатие"""
+        self.file.flush()
+        if self.job is not None:
+            if self.job.poll():
+                self.finish_compaction()
+        elif can_compact and self.size > max(MIN_COMPACT_BYTES, self.snapshot_size):
+            self.compact()
+
+    def compact(self):
+        """Снимок карты пишется в фоне, новые правки - в следующий журнал"""
+        self.file.close()
+        self.generation += 1
+        self.job = SaveJob(self.map, snapshot_path(self.directory, self.generation), copy=True).start()
+        self.open_journal({"kind": "snapshot"})
+
+    def finish_compaction(self):
+        job = self.job
+        self.job = None
+        if job.error is not None:
+            # Прежний журнал остается основой, новый продолжает его
+            print(f"Ошибка автосохранения: {job.error}")
+            return
+        self.snapshot_size = os.path.getsize(job.path)
+        self.remove_older(self.generation)
+
+    def wait(self):
+        """Дожидается идущего сжатия (перед сохранением карты пользователем)"""
+        if self.job is not None:
+            self.job.wait()
+            self.finish_compaction()
+
+    def remove_older(self, generation):
+        """Удаляет журналы и снимки сессии старше generation"""
+        for name in os.listdir(self.directory):
+            stem, ext = os.path.splitext(name)
+            if ext == ".tmp":
+                stem, ext = os.path.splitext(stem)
+            kind, _, number = stem.partition("-")
+            if kind in ("journal", "snapshot") and number.isdigit() and int(number) < generation:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass  # Снимок может быть еще открыт ленивой картой
+
+    def close(self):
+        """Нормальное завершение: журнал больше не нужен и удаляется"""
+        if self.record in self.map.listeners:
+            self.map.listeners.remove(self.record)
+        self.wait()
+        self.file.close()
+        self.lock.close()
+        discard_session(self.directory)
+
+
+def read_journal(path):
+    """Читает журнал: (основа, правки [(операция, имя тайла, данные)]).
+
+    Чтение останавливается на первой оборванной или поврежденной записи.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < JOURNAL_HEADER.size:
+        raise JournalError(f"{path}: журнал обрезан")
+    magic, version, base_length = JOURNAL_HEADER.unpack_from(data)
+    if magic != JOURNAL_MAGIC or version > JOURNAL_VERSION:
+        raise JournalError(f"{path}: неизвестный формат журнала")
+    position = JOURNAL_HEADER.size + base_length
+    base = json.loads(data[JOURNAL_HEADER.size:position].decode("utf-8"))
+
+    names = {}
+    records = []
+    while position + RECORD_HEADER.size <= len(data):
+        length, crc = RECORD_HEADER.unpack_from(data, position)
+        start = position + RECORD_HEADER.size
+        body = data[start:start + length]
+        if length < RECORD_PREFIX.size or len(body) < length or zlib.crc32(body) != crc:
+            break  # Запись оборвана сбоем
+        position = start + length
+
+        op, tile_id = RECORD_PREFIX.unpack_from(body)
+        payload = body[RECORD_PREFIX.size:]
+        if op == OP_NAME:
+            names[tile_id] = payload.decode("utf-8")
+            continue
+        name = names.get(tile_id)
+        if name is None:
+            break  # Правка без объявленного имени тайла - дальше журнал не читается
+        if op == OP_RECT:
+            records.append(('rect', name, RECT.unpack(payload)))
+        elif op == OP_SPANS:
+            records.append(('spans', name, list(SPAN.iter_unpack(payload))))
+        elif op == OP_FILL:
+            x, y, target_id = FILL.unpack(payload)
+            if target_id not in names:
+                break
+            records.append(('fill', name, (x, y, names[target_id])))
+    return base, records
+
+
+def apply_records(game_map, records):
+    """Повторяет правки журнала на карте"""
+    for op, name, data in records:
+        if op == 'rect':
+            game_map.set_rect(*data, name)
+        elif op == 'spans':
+            game_map.paint_spans(data, name)
+        else:
+            x, y, target = data
+            game_map.fill_area(x, y, target, name)
+
+
+def base_available(base, directory, generation):
+    if base is None:
+        return False
+    if base["kind"] == "new":
+        return True
+    if base["kind"] == "snapshot":
+        return os.path.exists(snapshot_path(directory, generation))
+    try:
+        stat = os.stat(base["path"])
+    except OSError:
+        return False
+    return stat.st_mtime_ns == base["mtime"] and stat.st_size == base["size"]
+
+
+def load_base(base, directory, generation):
+    if base["kind"] == "new":
+        return Map(base["width"], base["height"], base["default_tile"])
+    if base["kind"] == "snapshot":
+        return open_map_file(snapshot_path(directory, generation))
+    return open_map_file(base["path"])
+
+
+def recover_map(directory):
+    """Восстанавливает карту из папки сессии: самая новая доступная основа и все правки после нее"""
+    journals = []
+    for generation in list_generations(directory):
+        try:
+            base, records = read_journal(journal_path(directory, generation))
+        except (OSError, ValueError) as e:
+            print(f"Журнал {generation} пропущен: {e}")
+            base, records = None, []
+        journals.append((generation, base, records))
+
+    for start in range(len(journals) - 1, -1, -1):
+        generation, base, _ = journals[start]
+        if base_available(base, directory, generation):
+            break
+    else:
+        raise JournalError("нет основы для восстановления карты")
+
+    game_map = load_base(base, directory, generation)
+    for _, _, records in journals[start:]:
+        apply_records(game_map, records)
+    return game_map
@@ -1,16 +1,66 @@
 import pygame
+from utils.profiler import profiled
+from world.brush import BRUSH_SHAPES, get_mask
+from world.tiles import default_registry
+
+
+# Размер стороны чанка в тайлах (степень двойки)
+CHUNK_SHIFT = 5
+CHUNK_SIZE = 1 << CHUNK_SHIFT
+CHUNK_MASK = CHUNK_SIZE - 1
+
+# Сетка мельче этого размера тайла превращается в сплошную заливку
+GRID_MIN_TILE_SIZE = 4
+
+# Доступные размеры тайла на экране; дробные - несколько тайлов на пиксель
+ZOOM_LEVELS = [0.125, 0.25, 0.5, 1, 2, 4] + list(range(8, 49, 4))
+
+# Заготовленные строки чанка для каждого ID, чтобы не создавать их при каждой записи
+SPAN_FILLS = [bytes([tile_id]) * CHUNK_SIZE for tile_id in range(256)]
+
+
+class Chunk:
+    """Блок тайлов CHUNK_SIZE x CHUNK_SIZE с флагом изменений и версией.
+
+    frozen - сколько снимков карты (например, фоновых сохранений) держат
+    тайлы: перед записью чанк получает свою копию, а снимки остаются
+    неизменными.
+    """
+    __slots__ = ('tiles', 'version', 'dirty', 'frozen')
+
+    def __init__(self, tiles):
+        self.tiles = tiles
+        self.version = 0
+        self.dirty = False
+        self.frozen = 0
 
 
 class Map:
-    def __init__(self, width, height, default_tile='grass'):
+    def __init__(self, width, height, default_tile='grass', registry=None, chunks=None):
         self.width = width
         self.height = height
         self.default_tile = default_tile
-        self.tiles = [[default_tile for _ in range(width)] for _ in range(height)]
+        self.registry = registry if registry is not None else default_registry()
+        self.default_id = self.registry.get_id(default_tile)
+
+        # Тайлы хранятся чанками; внутри чанка - построчно, по байту на тайл
+        self.chunks_x = (width + CHUNK_SIZE - 1) >> CHUNK_SHIFT
+        self.chunks_y = (height + CHUNK_SIZE - 1) >> CHUNK_SHIFT
+        if chunks is None:
+            empty = bytearray([self.default_id]) * (CHUNK_SIZE * CHUNK_SIZE)
+            chunks = [Chunk(bytearray(empty)) for _ in range(self.chunks_x * self.chunks_y)]
+        # Список чанков или хранилище с тем же доступом по индексу (см. world.mapfile.MappedChunks)
+        self.chunks = chunks
+        # Глобальный счетчик правок: чанк получает текущую версию при изменении
+        self.version = 0
+        # Функции listener(op, tile_id, data), получающие каждую правку (см. world.journal)
+        self.listeners = []
+
         self.tile_size = 24
         self.camera_x = 0
         self.camera_y = 0
         self.brush_size = 1
+        self.brush_shape = 'disk'
         self.show_grid = True
 
         self.grid_colors = [
@@ -25,63 +75,323 @@ class Map:
 
         self.grid_styles = ['lines', 'dots', 'dashed']
         self.grid_style_index = 0
+        self.grid_cache = {}
+
+    @property
+    def tiles(self):
+        """Тайлы в виде списка строк с именами (для сохранения в JSON)"""
+        names = self.registry.names
+        return [[names[tile_id] for tile_id in self._read_span(y, 0, self.width)]
+                for y in range(self.height)]
+
+    @tiles.setter
+    def tiles(self, rows):
+        get_id = self.registry.get_id
+        self.version += 1
+        for y, row in enumerate(rows[:self.height]):
+            self._write_ids(y, 0, bytes(get_id(name) for name in row[:self.width]))
+
+    # --- Чанки и отслеживание изменений ---
+
+    def get_chunk(self, cx, cy):
+        """Возвращает чанк по координатам в сетке чанков"""
+        if 0 <= cx < self.chunks_x and 0 <= cy < self.chunks_y:
+            return self.chunks[cy * self.chunks_x + cx]
+        return None
+
+    def chunk_version(self, index):
+        """Версия чанка по индексу (не загружает чанк из файла)"""
+        chunks = self.chunks
+        if isinstance(chunks, list):
+            return chunks[index].version
+        return chunks.version(index)
+
+    def changed_chunks(self, since_version):
+        """Координаты чанков, измененных после версии since_version"""
+        chunks_x = self.chunks_x
+        return [(i % chunks_x, i // chunks_x)
+                for i, chunk in enumerate(self.chunks) if chunk.version > since_version]
+
+    def dirty_chunks(self):
+        """Координаты чанков с непогашенным флагом изменений"""
+        chunks_x = self.chunks_x
+        return [(i % chunks_x, i // chunks_x)
+                for i, chunk in enumerate(self.chunks) if chunk.dirty]
+
+    def clear_dirty(self):
+        """Сбрасывает флаги изменений (например, после сохранения)"""
+        for chunk in self.chunks:
+            chunk.dirty = False
+
+    def _notify(self, op, tile_id, data):
+        """Сообщает слушателям о правке: 'rect' (x, y, w, h), 'spans' [(y, x0, x1)] или 'fill' (x, y, target_id)"""
+        for listener in self.listeners:
+            listener(op, tile_id, data)
+
+    def _touch(self, chunk):
+        chunk.version = self.version
+        chunk.dirty = True
+
+    def _read_span(self, y, x0, x1):
+        """Читает ID тайлов строки y в диапазоне [x0, x1) (без проверки границ)"""
+        chunks = self.chunks
+        base = (y >> CHUNK_SHIFT) * self.chunks_x
+        offset = (y & CHUNK_MASK) << CHUNK_SHIFT
+        parts = []
+        x = x0
+        while x < x1:
+            local_x = x & CHUNK_MASK
+            count = min(x1 - x, CHUNK_SIZE - local_x)
+            start = offset + local_x
+            parts.append(chunks[base + (x >> CHUNK_SHIFT)].tiles[start:start + count])
+            x += count
+        return b''.join(parts)
+
+    def _write_span(self, y, x0, x1, tile_id):
+        """Заполняет строку y в диапазоне [x0, x1) одним ID (без проверки границ)"""
+        chunks = self.chunks
+        base = (y >> CHUNK_SHIFT) * self.chunks_x
+        offset = (y & CHUNK_MASK) << CHUNK_SHIFT
+        fill = SPAN_FILLS[tile_id]
+        x = x0
+        while x < x1:
+            local_x = x & CHUNK_MASK
+            count = min(x1 - x, CHUNK_SIZE - local_x)
+            start = offset + local_x
+            chunk = chunks[base + (x >> CHUNK_SHIFT)]
+            # Не трогаем чанк, если отрезок уже нужного типа
+            part = fill if count == CHUNK_SIZE else fill[:count]
+            if chunk.tiles[start:start + count] != part:
+                if chunk.frozen:
+                    chunk.tiles = bytearray(chunk.tiles)
+                    chunk.frozen = 0
+                chunk.tiles[start:start + count] = part
+                chunk.version = self.version
+                chunk.dirty = True
+            x += count
+
+    def _write_ids(self, y, x0, ids):
+        """Записывает последовательность ID в строку y начиная с x0 (без проверки границ)"""
+        chunks = self.chunks
+        base = (y >> CHUNK_SHIFT) * self.chunks_x
+        offset = (y & CHUNK_MASK) << CHUNK_SHIFT
+        x1 = x0 + len(ids)
+        x = x0
+        while x < x1:
+            local_x = x & CHUNK_MASK
+            count = min(x1 - x, CHUNK_SIZE - local_x)
+            start = offset + local_x
+            chunk = chunks[base + (x >> CHUNK_SHIFT)]
+            part = ids[x - x0:x - x0 + count]
+            if chunk.tiles[start:start + count] != part:
+                if chunk.frozen:
+                    chunk.tiles = bytearray(chunk.tiles)
+                    chunk.frozen = 0
+                chunk.tiles[start:start + count] = part
+                self._touch(chunk)
+            x += count
+
+    # --- Доступ к тайлам ---
 
     def get_tile(self, x, y):
         if 0 <= x < self.width and 0 <= y < self.height:
-            return self.tiles[y][x]
+            return self.registry.names[self.get_tile_id(x, y)]
+        return None
+
+    def get_tile_id(self, x, y):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            chunk = self.chunks[(y >> CHUNK_SHIFT) * self.chunks_x + (x >> CHUNK_SHIFT)]
+            return chunk.tiles[((y & CHUNK_MASK) << CHUNK_SHIFT) + (x & CHUNK_MASK)]
         return None
 
     def set_tile(self, x, y, tile_type):
         if 0 <= x < self.width and 0 <= y < self.height:
-            self.tiles[y][x] = tile_type
+            tile_id = self.registry.get_id(tile_type)
+            self.version += 1
+            self._write_span(y, x, x + 1, tile_id)
+            if self.listeners:
+                self._notify('rect', tile_id, (x, y, 1, 1))
+
+    def get_row_ids(self, y, x0=0, x1=None):
+        """Возвращает ID тайлов строки y в диапазоне [x0, x1) как bytes"""
+        if not 0 <= y < self.height:
+            return b''
+        x0 = max(0, x0)
+        x1 = self.width if x1 is None else min(self.width, x1)
+        return self._read_span(y, x0, x1)
+
+    def get_row(self, y, x0=0, x1=None):
+        """Возвращает имена тайлов строки y в диапазоне [x0, x1)"""
+        names = self.registry.names
+        return [names[tile_id] for tile_id in self.get_row_ids(y, x0, x1)]
+
+    def get_rect_ids(self, x, y, width, height):
+        """Возвращает ID тайлов прямоугольника (обрезанного по карте) построчно"""
+        return [self.get_row_ids(row, x, x + width)
+                for row in range(max(0, y), min(self.height, y + height))]
+
+    def get_rect(self, x, y, width, height):
+        """Возвращает имена тайлов прямоугольника (обрезанного по карте) построчно"""
+        return [self.get_row(row, x, x + width)
+                for row in range(max(0, y), min(self.height, y + height))]
 
-    def set_tiles_area(self, center_x, center_y, radius, tile_type):
-        """Устанавливает тайлы в пределах круга с заданным радиусом"""
-        radius_squared = radius * radius
+    @profiled("map.set_rect")
+    def set_rect(self, x, y, width, height, tile_type):
+        """Заполняет прямоугольник одним типом тайла"""
+        x0, x1 = max(0, x), min(self.width, x + width)
+        if x0 >= x1:
+            return
+        y0, y1 = max(0, y), min(self.height, y + height)
+        if y0 >= y1:
+            return
+        tile_id = self.registry.get_id(tile_type)
+        self.version += 1
+        for row in range(y0, y1):
+            self._write_span(row, x0, x1, tile_id)
+        if self.listeners:
+            self._notify('rect', tile_id, (x0, y0, x1 - x0, y1 - y0))
+
+    def set_tiles_area(self, center_x, center_y, radius, tile_type, shape='disk'):
+        """Устанавливает тайлы в пределах кисти (по умолчанию круга) с заданным радиусом"""
+        return self.stamp(center_x, center_y, get_mask(shape, radius), tile_type)
+
+    @profiled("map.stamp")
+    def stamp(self, center_x, center_y, mask, tile_type):
+        """Отпечатывает маску кисти с центром в (center_x, center_y).
+
+        Каждый отрезок маски обрезается по краям карты и записывается одним
+        присваиванием среза. Возвращает затронутую область в тайлах или None.
+        """
+        tile_id = self.registry.get_id(tile_type)
+        width, height = self.width, self.height
+        self.version += 1
+        # Для слушателей отпечаток записывается уже обрезанными отрезками
+        written = [] if self.listeners else None
+
+        min_x, min_y, max_x, max_y = width, height, -1, -1
+        for dy, dx0, dx1 in mask.spans:
+            y = center_y + dy
+            if not 0 <= y < height:
+                continue
+            x0 = max(0, center_x + dx0)
+            x1 = min(width, center_x + dx1)
+            if x0 >= x1:
+                continue
+            self._write_span(y, x0, x1, tile_id)
+            if written is not None:
+                written.append((y, x0, x1))
+            min_x, max_x = min(min_x, x0), max(max_x, x1 - 1)
+            min_y, max_y = min(min_y, y), max(max_y, y)
+
+        if max_x < 0:
+            return None
+        if written:
+            self._notify('spans', tile_id, written)
+        return pygame.Rect(min_x, min_y, max_x - min_x + 1, max_y - min_y + 1)
 
-        # Определяем границы области для проверки
-        min_x = max(0, center_x - radius)
-        max_x = min(self.width - 1, center_x + radius)
-        min_y = max(0, center_y - radius)
-        max_y = min(self.height - 1, center_y + radius)
+    @profiled("map.paint")
+    def paint_spans(self, spans, tile_type):
+        """Закрашивает отрезки строк (y, x0, x1), уже обрезанные по карте.
 
-        for y in range(min_y, max_y + 1):
-            for x in range(min_x, max_x + 1):
-                # Проверяем, попадает ли тайл в круг
-                dx = x - center_x
-                dy = y - center_y
-                distance_squared = dx * dx + dy * dy
+        Возвращает затронутую область в тайлах или None.
+        """
+        if not spans:
+            return None
+        tile_id = self.registry.get_id(tile_type)
+        self.version += 1
 
-                if distance_squared <= radius_squared:
-                    self.set_tile(x, y, tile_type)
+        min_x, min_y, max_x, max_y = self.width, self.height, -1, -1
+        for y, x0, x1 in spans:
+            self._write_span(y, x0, x1, tile_id)
+            min_x, max_x = min(min_x, x0), max(max_x, x1 - 1)
+            min_y, max_y = min(min_y, y), max(max_y, y)
+        if self.listeners:
+            self._notify('spans', tile_id, spans)
+        return pygame.Rect(min_x, min_y, max_x - min_x + 1, max_y - min_y + 1)
 
+    @profiled("map.fill")
     def fill_area(self, x, y, target_tile, replacement_tile):
-        """Заливка области (рекурсивная)"""
+        """Заливка области построчными отрезками (scanline).
+
+        Обход идет только по байтовым маскам строк "можно залить": в стек
+        кладутся начала отрезков, уже залитые клетки обнуляются в маске.
+        Карта записывается в конце, один раз на затронутую строку.
+        Возвращает затронутую область в тайлах или None.
+        """
         if target_tile == replacement_tile:
-            return
+            return None
+        if self.get_tile(x, y) != target_tile:
+            return None
 
-        stack = [(x, y)]
-        visited = set()
+        target_id = self.registry.get_id(target_tile)
+        replacement_id = self.registry.get_id(replacement_tile)
+        width, height = self.width, self.height
+        self.version += 1
 
+        # Таблица перевода ID тайла в 1 (целевой тип) или 0 (остальные)
+        table = bytearray(256)
+        table[target_id] = 1
+        rows = [None] * height  # Строка -> (ID тайлов, исходная маска)
+        masks = [None] * height  # Строка -> маска еще не залитых клеток
+
+        ids = self._read_span(y, 0, width)
+        rows[y] = (ids, ids.translate(table))
+        masks[y] = bytearray(rows[y][1])
+        stack = [x, y]  # Пары x, y подряд - без кортежа на каждое начало отрезка
         while stack:
-            cx, cy = stack.pop()
-            if (cx, cy) in visited:
-                continue
-            visited.add((cx, cy))
+            sy = stack.pop()
+            sx = stack.pop()
+            mask = masks[sy]
+            if not mask[sx]:
+                continue  # Начало уже залито соседним отрезком
 
-            if not (0 <= cx < self.width and 0 <= cy < self.height):
-                continue
+            # Расширяем отрезок влево и вправо до границ области
+            left = mask.rfind(0, 0, sx) + 1
+            right = mask.find(0, sx)
+            if right == -1:
+                right = width
+            mask[left:right] = bytes(right - left)
 
-            if self.get_tile(cx, cy) != target_tile:
-                continue
+            # Ищем начала незалитых отрезков в соседних строках
+            for ny in (sy - 1, sy + 1):
+                if not 0 <= ny < height:
+                    continue
+                neighbour = masks[ny]
+                if neighbour is None:
+                    ids = self._read_span(ny, 0, width)
+                    rows[ny] = (ids, ids.translate(table))
+                    neighbour = masks[ny] = bytearray(rows[ny][1])
+                start = neighbour.find(1, left, right)
+                while start != -1:
+                    stack.append(start)
+                    stack.append(ny)
+                    end = neighbour.find(0, start, right)
+                    if end == -1:
+                        break
+                    start = neighbour.find(1, end, right)
 
-            self.set_tile(cx, cy, replacement_tile)
+        # Залитые клетки - разница исходной и оставшейся маски. Маска из 0 и 1
+        # как целое число: прибавка mask * (замена - цель) меняет только
+        # залитые байты, переносов между байтами нет.
+        delta = replacement_id - target_id
+        min_x, min_y, max_x, max_y = width, height, -1, -1
+        for row, mask in enumerate(masks):
+            if mask is None:
+                continue
+            ids, original = rows[row]
+            filled = int.from_bytes(original, 'little') ^ int.from_bytes(mask, 'little')
+            if not filled:
+                continue
+            first = ((filled & -filled).bit_length() - 1) >> 3
+            last = (filled.bit_length() - 1) >> 3
+            new_ids = (int.from_bytes(ids, 'little') + filled * delta).to_bytes(width, 'little')
+            self._write_ids(row, first, new_ids[first:last + 1])
+            min_x, max_x = min(min_x, first), max(max_x, last)
+            min_y, max_y = min(min_y, row), max(max_y, row)
 
-            # Добавляем соседей
-            stack.append((cx + 1, cy))
-            stack.append((cx - 1, cy))
-            stack.append((cx, cy + 1))
-            stack.append((cx, cy - 1))
+        if self.listeners:
+            self._notify('fill', replacement_id, (x, y, target_id))
+        return pygame.Rect(min_x, min_y, max_x - min_x + 1, max_y - min_y + 1)
 
     def toggle_grid_color(self):
         """Переключение цвета сетки по Shift+G"""
@@ -92,66 +402,106 @@ class Map:
         """Переключение стиля сетки по Ctrl+G"""
         self.grid_style_index = (self.grid_style_index + 1) % len(self.grid_styles)
 
-    def draw_grid(self, surface, camera_offset_x, camera_offset_y):
-        """Модифицированная отрисовка сетки с разными стилями"""
-        if not self.show_grid:
-            return
+    def toggle_brush_shape(self):
+        """Переключение формы кисти по клавише B"""
+        shapes = list(BRUSH_SHAPES)
+        self.brush_shape = shapes[(shapes.index(self.brush_shape) + 1) % len(shapes)]
 
-        grid_surface = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
-        current_style = self.grid_styles[self.grid_style_index]
+    def build_grid_pattern(self, size, tile_size, style, color):
+        """Рисует узор сетки размером с экран плюс одна клетка (для сдвига камерой)"""
+        width, height = size[0] + tile_size, size[1] + tile_size
+        pattern = pygame.Surface((width, height), pygame.SRCALPHA)
+
+        if style == 'lines':
+            for screen_x in range(0, width, tile_size):
+                pygame.draw.line(pattern, color, (screen_x, 0), (screen_x, height), 1)
+            for screen_y in range(0, height, tile_size):
+                pygame.draw.line(pattern, color, (0, screen_y), (width, screen_y), 1)
 
-        if current_style == 'lines':
-            # Оригинальный код рисования линий
-            for x in range(self.width + 1):
-                screen_x = x * self.tile_size - camera_offset_x
-                pygame.draw.line(grid_surface, self.grid_color,
-                                 (screen_x, 0), (screen_x, surface.get_height()), 1)
-            for y in range(self.height + 1):
-                screen_y = y * self.tile_size - camera_offset_y
-                pygame.draw.line(grid_surface, self.grid_color,
-                                 (0, screen_y), (surface.get_width(), screen_y), 1)
-
-        elif current_style == 'dots':
-            # Рисуем точки на пересечениях
+        elif style == 'dots':
+            # Точки на пересечениях
             dot_radius = 1
-            for x in range(self.width + 1):
-                for y in range(self.height + 1):
-                    screen_x = x * self.tile_size - camera_offset_x
-                    screen_y = y * self.tile_size - camera_offset_y
-                    pygame.draw.circle(grid_surface, self.grid_color,
-                                       (screen_x, screen_y), dot_radius)
-
-        elif current_style == 'dashed':
+            for screen_x in range(0, width, tile_size):
+                for screen_y in range(0, height, tile_size):
+                    pygame.draw.circle(pattern, color, (screen_x, screen_y), dot_radius)
+
+        elif style == 'dashed':
             # Пунктирные линии
             dash_length = 4
             gap_length = 4
 
             # Вертикальные линии
-            for x in range(self.width + 1):
-                screen_x = x * self.tile_size - camera_offset_x
-                for y_start in range(0, surface.get_height(), dash_length + gap_length):
-                    pygame.draw.line(grid_surface, self.grid_color,
+            for screen_x in range(0, width, tile_size):
+                for y_start in range(0, height, dash_length + gap_length):
+                    pygame.draw.line(pattern, color,
                                      (screen_x, y_start),
-                                     (screen_x, min(y_start + dash_length, surface.get_height())),
+                                     (screen_x, min(y_start + dash_length, height)),
                                      1)
 
             # Горизонтальные линии
-            for y in range(self.height + 1):
-                screen_y = y * self.tile_size - camera_offset_y
-                for x_start in range(0, surface.get_width(), dash_length + gap_length):
-                    pygame.draw.line(grid_surface, self.grid_color,
+            for screen_y in range(0, height, tile_size):
+                for x_start in range(0, width, dash_length + gap_length):
+                    pygame.draw.line(pattern, color,
                                      (x_start, screen_y),
-                                     (min(x_start + dash_length, surface.get_width()), screen_y),
+                                     (min(x_start + dash_length, width), screen_y),
                                      1)
 
-        surface.blit(grid_surface, (0, 0))
+        return pattern
+
+    @profiled("map.grid")
+    def draw_grid(self, surface, camera_offset_x, camera_offset_y):
+        """Отрисовка сетки с разными стилями.
+
+        Узор кэшируется для каждой комбинации (размер тайла, стиль, цвет,
+        размер экрана) и накладывается одним blit, обрезанным по карте.
+        """
+        if not self.show_grid or self.tile_size < GRID_MIN_TILE_SIZE:
+            return
+
+        tile_size = int(self.tile_size)
+        current_style = self.grid_styles[self.grid_style_index]
+        key = (tile_size, current_style, self.grid_color, surface.get_size())
+        pattern = self.grid_cache.get(key)
+        if pattern is None:
+            if len(self.grid_cache) >= 16:
+                self.grid_cache.clear()
+            pattern = self.build_grid_pattern(surface.get_size(), tile_size, current_style, self.grid_color)
+            self.grid_cache[key] = pattern
+
+        # Сетка рисуется только в пределах карты (с линией по правому и нижнему краю)
+        map_rect = pygame.Rect(-camera_offset_x, -camera_offset_y,
+                               self.width * tile_size + 1, self.height * tile_size + 1)
+        visible = map_rect.clip(surface.get_rect())
+        if not visible:
+            return
+
+        previous_clip = surface.get_clip()
+        surface.set_clip(visible)
+        surface.blit(pattern, (-(camera_offset_x % tile_size), -(camera_offset_y % tile_size)))
+        surface.set_clip(previous_clip)
+
+    def screen_to_tile(self, pos):
+        """Переводит экранные координаты в координаты тайла с учетом камеры"""
+        return (int((pos[0] + self.camera_x) // self.tile_size),
+                int((pos[1] + self.camera_y) // self.tile_size))
+
+    def set_zoom(self, tile_size, anchor=None):
+        """Меняет масштаб, сохраняя точку карты под anchor (экранные координаты)"""
+        anchor_x, anchor_y = anchor if anchor is not None else (0, 0)
+        world_x = (anchor_x + self.camera_x) / self.tile_size
+        world_y = (anchor_y + self.camera_y) / self.tile_size
+        self.tile_size = tile_size
+        self.camera_x = int(world_x * tile_size - anchor_x)
+        self.camera_y = int(world_y * tile_size - anchor_y)
 
-    def zoom_in(self):
+    def zoom_in(self, anchor=None):
         """Увеличивает масштаб"""
-        if self.tile_size < 48:  # Максимальный размер
-            self.tile_size += 4
+        larger = [size for size in ZOOM_LEVELS if size > self.tile_size]
+        if larger:  # Максимальный размер - последний уровень
+            self.set_zoom(larger[0], anchor)
 
-    def zoom_out(self):
+    def zoom_out(self, anchor=None):
         """Уменьшает масштаб"""
-        if self.tile_size > 8:  # Минимальный размер
-            self.tile_size -= 4
\ No newline at end of file
+        smaller = [size for size in ZOOM_LEVELS if size < self.tile_size]
+        if smaller:  # Минимальный размер - первый уровень
+            self.set_zoom(smaller[-1], anchor)
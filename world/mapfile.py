@@ -0,0 +1,441 @@
+"""Двоичный формат файлов карт (.smap) и конвертер старых .json карт.
+
+Структура файла (little-endian):
+
+    заголовок   MAGIC, версия, флаги, ширина, высота, размер чанка,
+                индекс тайла по умолчанию в палитре, число записей палитры
+    палитра     для каждого ID: длина имени (1 байт) и имя в UTF-8
+    таблица     для каждого чанка (построчно): смещение и длина данных
+    данные      чанки, сжатые zlib; чанк из одного тайла хранится без данных:
+                длина 0, а в поле смещения - ID этого тайла
+
+ID тайлов в файле - индексы его палитры. При загрузке они переводятся в ID
+реестра карты одной таблицей bytes.translate на чанк.
+
+open_map_file открывает .smap лениво: файл отображается в память (mmap),
+а чанки распаковываются, только когда к ним обращаются (см. MappedChunks).
+"""
+from collections import OrderedDict
+import argparse
+import json
+import mmap
+import os
+import struct
+import zlib
+from world.map import CHUNK_SIZE, Chunk, Map
+from world.tiles import TileRegistry
+
+MAP_EXTENSION = ".smap"
+LEGACY_EXTENSION = ".json"
+MAP_EXTENSIONS = (MAP_EXTENSION, LEGACY_EXTENSION)
+
+MAGIC = b"SMAP"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHIIHHH")
+CHUNK_ENTRY = struct.Struct("<II")
+COMPRESSION_LEVEL = 6
+# Сколько распакованных чанков держит ленивая карта (по 1 КБ тайлов на чанк)
+DEFAULT_CHUNK_CACHE = 4096
+
+
+class MapFileError(ValueError):
+    """Файл карты поврежден или имеет неизвестный формат"""
+
+
+def read_header(f):
+    """Читает заголовок и палитру, возвращает словарь с полями заголовка"""
+    data = f.read(HEADER.size)
+    if len(data) < HEADER.size:
+        raise MapFileError("файл слишком короткий")
+    magic, version, flags, width, height, chunk_size, default_index, palette_size = HEADER.unpack(data)
+    if magic != MAGIC:
+        raise MapFileError("это не файл карты Selectown")
+    if version > FORMAT_VERSION:
+        raise MapFileError(f"неподдерживаемая версия формата {version}")
+    if chunk_size != CHUNK_SIZE:
+        raise MapFileError(f"неподдерживаемый размер чанка {chunk_size}")
+
+    palette = []
+    for _ in range(palette_size):
+        length = f.read(1)
+        if not length:
+            raise MapFileError("палитра обрезана")
+        palette.append(f.read(length[0]).decode("utf-8"))
+    if default_index >= len(palette):
+        raise MapFileError("тайл по умолчанию вне палитры")
+
+    return {
+        "version": version,
+        "flags": flags,
+        "width": width,
+        "height": height,
+        "default_tile": palette[default_index],
+        "palette": palette
+    }
+
+
+def read_map_info(path):
+    """Размер и тайл по умолчанию без чтения тайлов (для списков и миниатюр)"""
+    if path.endswith(LEGACY_EXTENSION):
+        with open(path, "r") as f:
+            map_info = json.load(f)
+        return {"width": map_info["size"], "height": map_info["size"],
+                "default_tile": map_info.get("default_tile", "grass")}
+    with open(path, "rb") as f:
+        return read_header(f)
+
+
+def chunk_count(width, height):
+    """Число чанков карты заданного размера"""
+    return ((width + CHUNK_SIZE - 1) // CHUNK_SIZE) * ((height + CHUNK_SIZE - 1) // CHUNK_SIZE)
+
+
+def encode_chunk(tiles):
+    """Тайлы чанка -> (ID заливки, None) для однородного чанка или (0, сжатые данные)"""
+    first = tiles[0]
+    if tiles.count(first) == len(tiles):
+        return first, None
+    return 0, zlib.compress(tiles, COMPRESSION_LEVEL)
+
+
+class MapSnapshot:
+    """Неизменяемый срез карты для записи в файл, в том числе из другого потока.
+
+    Снимок забирает ссылки на тайлы чанков и помечает чанки замороженными:
+    правки после снимка идут в копии (копирование при записи), поэтому
+    снимок стоит O(число чанков) без копирования тайлов. У лениво открытой
+    карты в снимок попадают только измененные чанки, остальные копируются
+    из исходного файла.
+
+    write можно вызывать в фоновом потоке, commit и release - только в
+    главном, когда запись закончена.
+    """
+
+    def __init__(self, game_map):
+        self.width = game_map.width
+        self.height = game_map.height
+        self.default_id = game_map.default_id
+        self.palette = list(game_map.registry.names)
+        chunks = game_map.chunks
+        self.source = chunks if isinstance(chunks, MappedChunks) else None
+        self.count = len(chunks)
+
+        # индекс -> тайлы чанка на момент снимка
+        if self.source is None:
+            items = enumerate(chunks)
+        else:
+            items = [(index, chunk) for index, chunk in self.source.loaded.items() if chunk.dirty]
+        self.tiles = {}
+        for index, chunk in items:
+            chunk.frozen += 1
+            self.tiles[index] = chunk.tiles
+
+    def write(self, path, progress=None):
+        """Пишет снимок в файл path; progress(доля) вызывается по ходу сжатия"""
+        palette = [name.encode("utf-8") for name in self.palette]
+
+        # Сначала сжимаем чанки, чтобы знать смещения
+        bodies = []
+        step = max(1, self.count // 100)
+        for index in range(self.count):
+            tiles = self.tiles.get(index)
+            bodies.append(encode_chunk(tiles) if tiles is not None else self.source.raw(index))
+            if progress is not None and index % step == 0:
+                progress(index / self.count)
+
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, self.width, self.height,
+                             CHUNK_SIZE, self.default_id, len(palette))
+        palette_data = b"".join(bytes([len(name)]) + name for name in palette)
+        offset = len(header) + len(palette_data) + CHUNK_ENTRY.size * len(bodies)
+
+        table = []
+        for fill_id, body in bodies:
+            if body is None:
+                table.append(CHUNK_ENTRY.pack(fill_id, 0))
+            else:
+                table.append(CHUNK_ENTRY.pack(offset, len(body)))
+                offset += len(body)
+
+        try:
+            with open(path, "wb") as f:
+                f.write(header)
+                f.write(palette_data)
+                f.write(b"".join(table))
+                for _, body in bodies:
+                    if body is not None:
+                        f.write(body)
+        except OSError:
+            # Недописанный файл не оставляем
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        if progress is not None:
+            progress(1.0)
+
+    def commit(self, game_map, temp_path, path):
+        """Атомарно заменяет path записанным temp_path и снимает пометки с карты"""
+        source = self.source
+        if source is not None:
+            # Отображение нужно закрыть до замены файла (иначе Windows не даст его заменить)
+            source.close()
+        try:
+            os.replace(temp_path, path)
+        except OSError:
+            if source is not None:
+                source.open(source.path)
+            raise
+        if source is not None:
+            source.open(path)
+        self.release(game_map, saved=True)
+
+    def release(self, game_map, saved=False):
+        """Размораживает чанки, не измененные после снимка (и при saved снимает с них флаг изменений)"""
+        chunks = game_map.chunks
+        for index, tiles in self.tiles.items():
+            chunk = chunks[index]
+            if chunk.tiles is tiles:
+                chunk.frozen -= 1
+                if saved:
+                    chunk.dirty = False
+        if self.source is not None:
+            self.source.evict()  # Сохраненные чанки снова можно вытеснять
+
+
+def save_map_file(game_map, path):
+    """Сохраняет карту в формате .smap (через временный файл и атомарную замену).
+
+    У лениво открытой карты неизмененные чанки копируются из исходного файла
+    без распаковки, сжимаются заново только измененные.
+    """
+    snapshot = MapSnapshot(game_map)
+    temp_path = path + ".tmp"
+    try:
+        snapshot.write(temp_path)
+    except Exception:
+        snapshot.release(game_map)
+        raise
+    snapshot.commit(game_map, temp_path, path)
+
+
+def decode_chunk(index, fill_id, body):
+    """Запись чанка из файла (см. encode_chunk) -> тайлы чанка"""
+    if body is None:
+        return bytearray([fill_id]) * (CHUNK_SIZE * CHUNK_SIZE)
+    tiles = bytearray(zlib.decompress(body))
+    if len(tiles) != CHUNK_SIZE * CHUNK_SIZE:
+        raise MapFileError(f"чанк {index} поврежден")
+    return tiles
+
+
+def id_table(palette, registry):
+    """Таблица перевода ID палитры файла в ID реестра или None, если они совпадают"""
+    ids = [registry.get_id(name) for name in palette]
+    if ids == list(range(len(ids))):
+        return None
+    return bytes(ids + [0] * (256 - len(ids)))
+
+
+def read_chunks(f, count):
+    """Читает чанки из файла, стоящего сразу после заголовка.
+
+    Отдает по порядку (индекс, тайлы) с ID в палитре файла.
+    """
+    entries = f.read(CHUNK_ENTRY.size * count)
+    if len(entries) < CHUNK_ENTRY.size * count:
+        raise MapFileError("таблица чанков обрезана")
+
+    for index, (offset, length) in enumerate(CHUNK_ENTRY.iter_unpack(entries)):
+        if length == 0:
+            yield index, decode_chunk(index, offset, None)
+            continue
+        f.seek(offset)
+        yield index, decode_chunk(index, 0, f.read(length))
+
+
+def load_map_file(path):
+    """Загружает карту из .smap или старого .json (по расширению)"""
+    if path.endswith(LEGACY_EXTENSION):
+        return load_json_map(path)
+
+    with open(path, "rb") as f:
+        header = read_header(f)
+        game_map = Map(header["width"], header["height"], header["default_tile"])
+        table = id_table(header["palette"], game_map.registry)
+        for index, tiles in read_chunks(f, len(game_map.chunks)):
+            if table is not None:
+                tiles = tiles.translate(table)
+            game_map.chunks[index].tiles = tiles
+
+    return game_map
+
+
+class MappedChunks:
+    """Чанки карты из файла .smap, распаковываемые по требованию.
+
+    Заменяет список Map.chunks: доступ по индексу распаковывает чанк из
+    отображенного в память файла и кладет его в LRU на capacity чанков.
+    Вытесняются только неизмененные чанки - измененные остаются в памяти до
+    сохранения. Версии вытесненных чанков запоминаются, чтобы кэш
+    отрисовки не считал их новыми.
+
+    Открытие читает только заголовок, поэтому не зависит от размера карты.
+    ID тайлов в файле совпадают с ID реестра карты: реестр строится по
+    палитре файла (см. open_map_file).
+    """
+
+    def __init__(self, path, count, capacity=DEFAULT_CHUNK_CACHE):
+        self.count = count
+        self.capacity = capacity
+        self.loaded = OrderedDict()  # индекс -> Chunk
+        self.versions = {}  # индекс -> версия вытесненного чанка
+        self.path = path
+        self.data = None
+        self.table_offset = 0
+        self.open(path)
+
+    def open(self, path):
+        """Отображает файл в память и находит таблицу чанков"""
+        with open(path, "rb") as f:
+            read_header(f)
+            self.table_offset = f.tell()
+            # mmap держит свой дескриптор, файл можно сразу закрыть
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.path = path
+        if len(self.data) < self.table_offset + CHUNK_ENTRY.size * self.count:
+            self.close()
+            raise MapFileError("таблица чанков обрезана")
+
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        chunk = self.loaded.get(index)
+        if chunk is not None:
+            self.loaded.move_to_end(index)
+            return chunk
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+
+        chunk = Chunk(decode_chunk(index, *self.raw(index)))
+        chunk.version = self.versions.pop(index, 0)
+        self.loaded[index] = chunk
+        self.evict()
+        return chunk
+
+    def __iter__(self):
+        """Все чанки по порядку; вместо вытесненных - заглушки без тайлов с их версией.
+
+        Нужен для обходов вроде Map.changed_chunks и не распаковывает файл.
+        """
+        for index in range(self.count):
+            chunk = self.loaded.get(index)
+            if chunk is None:
+                chunk = Chunk(None)
+                chunk.version = self.versions.get(index, 0)
+            yield chunk
+
+    def raw(self, index):
+        """Запись чанка в файле: (ID заливки, None) или (0, сжатые данные)"""
+        offset, length = CHUNK_ENTRY.unpack_from(self.data, self.table_offset + CHUNK_ENTRY.size * index)
+        if length == 0:
+            return offset, None
+        return 0, self.data[offset:offset + length]
+
+    def version(self, index):
+        chunk = self.loaded.get(index)
+        if chunk is not None:
+            return chunk.version
+        return self.versions.get(index, 0)
+
+    def evict(self):
+        """Вытесняет давно не используемые неизмененные чанки сверх capacity"""
+        excess = len(self.loaded) - self.capacity
+        if excess <= 0:
+            return
+        # Последний чанк только что выдан вызывающему коду - его не трогаем
+        newest = next(reversed(self.loaded))
+        victims = []
+        for index, chunk in self.loaded.items():
+            if not chunk.dirty and index != newest:
+                victims.append(index)
+                if len(victims) == excess:
+                    break
+        for index in victims:
+            chunk = self.loaded.pop(index)
+            if chunk.version:
+                self.versions[index] = chunk.version
+
+
+def open_map_file(path, capacity=DEFAULT_CHUNK_CACHE):
+    """Открывает карту для редактора: .smap - лениво через mmap, .json - целиком"""
+    if path.endswith(LEGACY_EXTENSION):
+        return load_json_map(path)
+
+    with open(path, "rb") as f:
+        header = read_header(f)
+    registry = TileRegistry(header["palette"])
+    width, height = header["width"], header["height"]
+    chunks = MappedChunks(path, chunk_count(width, height), capacity)
+    return Map(width, height, header["default_tile"], registry, chunks)
+
+
+def load_json_map(path):
+    """Загружает карту из старого JSON-формата редактора"""
+    with open(path, "r") as f:
+        map_info = json.load(f)
+    game_map = Map(map_info['size'], map_info['size'], map_info.get('default_tile', 'grass'))
+    game_map.tiles = map_info['tiles']
+    return game_map
+
+
+def convert_json(path, remove=False):
+    """Конвертирует .json карту в .smap рядом с ней, возвращает путь нового файла"""
+    target = os.path.splitext(path)[0] + MAP_EXTENSION
+    save_map_file(load_json_map(path), target)
+    old_size, new_size = os.path.getsize(path), os.path.getsize(target)
+    print(f"{path} -> {target}: {old_size} -> {new_size} байт")
+    if remove:
+        os.remove(path)
+    return target
+
+
+def list_map_files(directory="maps"):
+    """Имена файлов карт в папке.
+
+    Старый .json не показывается, если рядом уже есть .smap с тем же
+    именем (после convert): в списке они выглядели бы одинаково.
+    """
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(name for name in os.listdir(directory) if name.endswith(MAP_EXTENSIONS))
+    converted = {os.path.splitext(name)[0] for name in names if name.endswith(MAP_EXTENSION)}
+    return [name for name in names
+            if not (name.endswith(LEGACY_EXTENSION) and os.path.splitext(name)[0] in converted)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Файлы карт Selectown")
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert = commands.add_parser("convert", help="конвертировать .json карты в .smap")
+    convert.add_argument("paths", nargs="*", default=["maps"],
+                         help="файлы .json или папки с ними (по умолчанию maps)")
+    convert.add_argument("--remove", action="store_true", help="удалить исходные .json после конвертации")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        if os.path.isdir(path):
+            files = [os.path.join(path, name) for name in sorted(os.listdir(path))
+                     if name.endswith(LEGACY_EXTENSION)]
+        else:
+            files = [path]
+        for file_path in files:
+            convert_json(file_path, args.remove)
+
+
+if __name__ == "__main__":
+    main()
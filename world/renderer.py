@@ -0,0 +1,181 @@
+from collections import OrderedDict
+import math
+import pygame
+from utils.profiler import profiled
+from world.map import CHUNK_SIZE
+from world.tiles import UNKNOWN_TILE_COLOR
+
+# Ниже этого размера тайла карта рисуется из поверхности «пиксель на тайл»
+LOD_TILE_SIZE = 8
+
+
+class MapRenderer:
+    """Отрисовка карты через кэш готовых поверхностей чанков.
+
+    Для каждого масштаба (tile_size) чанк рисуется один раз в 8-битную
+    палитровую поверхность и дальше только копируется на экран. Чанк
+    перерисовывается, когда его версия расходится с версией в кэше.
+    Кэш ограничен по числу пикселей и вытесняет давно не видимые чанки.
+
+    При мелком масштабе (tile_size < LOD_TILE_SIZE) используется уровень
+    детализации: вся карта хранится в одной 8-битной поверхности, где
+    пиксель - это ID тайла, а видимая часть масштабируется на экран.
+    """
+
+    def __init__(self, tile_colors, max_pixels=64 * 1024 * 1024):
+        self.tile_colors = tile_colors
+        self.max_pixels = max_pixels
+        self.cache = OrderedDict()  # (tile_size, cx, cy) -> (версия, поверхность)
+        self.cache_pixels = 0
+        self.map = None
+        self.palette = []
+        self.palette_size = 0
+
+        self.lod_surface = None
+        self.lod_versions = []
+        self.lod_scaled = None
+        self.lod_scaled_key = None
+
+    def invalidate(self):
+        """Сбрасывает весь кэш поверхностей"""
+        self.cache.clear()
+        self.cache_pixels = 0
+        self.lod_surface = None
+        self.lod_versions = []
+        self.lod_scaled = None
+        self.lod_scaled_key = None
+
+    def build_palette(self, game_map):
+        """Палитра ID тайла -> цвет по реестру карты"""
+        names = game_map.registry.names
+        palette = [self.tile_colors.get(name, UNKNOWN_TILE_COLOR) for name in names]
+        palette.extend([UNKNOWN_TILE_COLOR] * (256 - len(palette)))
+        self.palette = palette
+        self.palette_size = len(names)
+
+    def sync(self, game_map):
+        """Сбрасывает кэш при смене карты или набора типов тайлов"""
+        if game_map is not self.map or len(game_map.registry) != self.palette_size:
+            self.map = game_map
+            self.build_palette(game_map)
+            self.invalidate()
+
+    def chunk_surface(self, game_map, cx, cy, tile_size):
+        """Возвращает поверхность чанка для масштаба tile_size, перерисовывая при изменениях"""
+        index = cy * game_map.chunks_x + cx
+        key = (tile_size, cx, cy)
+        entry = self.cache.get(key)
+        if entry is not None and entry[0] == game_map.chunk_version(index):
+            self.cache.move_to_end(key)
+            return entry[1]
+
+        chunk = game_map.chunks[index]
+
+        # Один пиксель на тайл, затем масштабирование до размера тайла
+        small = pygame.image.frombuffer(chunk.tiles, (CHUNK_SIZE, CHUNK_SIZE), 'P')
+        small.set_palette(self.palette)
+        side = CHUNK_SIZE * tile_size
+        surface = pygame.transform.scale(small, (side, side))
+
+        if entry is not None:
+            self.cache_pixels -= side * side
+        self.cache[key] = (chunk.version, surface)
+        self.cache.move_to_end(key)
+        self.cache_pixels += side * side
+
+        # Вытесняем самые давние поверхности, оставляя хотя бы текущую
+        while self.cache_pixels > self.max_pixels and len(self.cache) > 1:
+            (old_size, _, _), _ = self.cache.popitem(last=False)
+            self.cache_pixels -= (CHUNK_SIZE * old_size) ** 2
+
+        return surface
+
+    @profiled("map.draw")
+    def draw(self, surface, game_map, camera=None):
+        """Рисует видимую часть карты с учетом камеры.
+
+        camera - смещение (x, y) для отрисовки, по умолчанию камера карты.
+        """
+        self.sync(game_map)
+        if camera is None:
+            camera = (game_map.camera_x, game_map.camera_y)
+        if game_map.tile_size < LOD_TILE_SIZE:
+            self.draw_lod(surface, game_map, *camera)
+        else:
+            self.draw_chunks(surface, game_map, *camera)
+
+    def draw_chunks(self, surface, game_map, camera_x, camera_y):
+        """Рисует видимые чанки из кэша поверхностей"""
+        tile_size = game_map.tile_size
+        chunk_pixels = CHUNK_SIZE * tile_size
+        map_width = game_map.width * tile_size
+        map_height = game_map.height * tile_size
+        screen_width, screen_height = surface.get_size()
+
+        # Диапазон видимых чанков
+        first_cx = max(0, camera_x // chunk_pixels)
+        last_cx = min(game_map.chunks_x - 1, (camera_x + screen_width - 1) // chunk_pixels)
+        first_cy = max(0, camera_y // chunk_pixels)
+        last_cy = min(game_map.chunks_y - 1, (camera_y + screen_height - 1) // chunk_pixels)
+
+        for cy in range(first_cy, last_cy + 1):
+            chunk_y = cy * chunk_pixels
+            # Крайние чанки обрезаются по границе карты
+            height = min(chunk_pixels, map_height - chunk_y)
+            for cx in range(first_cx, last_cx + 1):
+                chunk_x = cx * chunk_pixels
+                width = min(chunk_pixels, map_width - chunk_x)
+                chunk_surface = self.chunk_surface(game_map, cx, cy, tile_size)
+                surface.blit(chunk_surface, (chunk_x - camera_x, chunk_y - camera_y),
+                             (0, 0, width, height))
+
+    def update_lod(self, game_map, first_cx, last_cx, first_cy, last_cy):
+        """Переносит измененные чанки диапазона в поверхность уровня детализации"""
+        if self.lod_surface is None:
+            size = (game_map.chunks_x * CHUNK_SIZE, game_map.chunks_y * CHUNK_SIZE)
+            self.lod_surface = pygame.Surface(size, 0, 8)
+            self.lod_surface.set_palette(self.palette)
+            self.lod_versions = [-1] * len(game_map.chunks)
+
+        changed = False
+        for cy in range(first_cy, last_cy + 1):
+            for cx in range(first_cx, last_cx + 1):
+                index = cy * game_map.chunks_x + cx
+                if self.lod_versions[index] == game_map.chunk_version(index):
+                    continue
+                chunk = game_map.chunks[index]
+                small = pygame.image.frombuffer(chunk.tiles, (CHUNK_SIZE, CHUNK_SIZE), 'P')
+                small.set_palette(self.palette)
+                self.lod_surface.blit(small, (cx * CHUNK_SIZE, cy * CHUNK_SIZE))
+                self.lod_versions[index] = chunk.version
+                changed = True
+        return changed
+
+    def draw_lod(self, surface, game_map, camera_x, camera_y):
+        """Рисует карту масштабированием поверхности «пиксель на тайл»"""
+        tile_size = game_map.tile_size
+        screen_width, screen_height = surface.get_size()
+
+        # Видимый диапазон тайлов
+        first_x = max(0, math.floor(camera_x / tile_size))
+        first_y = max(0, math.floor(camera_y / tile_size))
+        last_x = min(game_map.width, math.ceil((camera_x + screen_width) / tile_size))
+        last_y = min(game_map.height, math.ceil((camera_y + screen_height) / tile_size))
+        if first_x >= last_x or first_y >= last_y:
+            return
+
+        changed = self.update_lod(game_map,
+                                  first_x // CHUNK_SIZE, (last_x - 1) // CHUNK_SIZE,
+                                  first_y // CHUNK_SIZE, (last_y - 1) // CHUNK_SIZE)
+
+        # Масштабированная картинка переиспользуется, пока карта и вид не меняются
+        key = (tile_size, first_x, first_y, last_x, last_y)
+        if changed or key != self.lod_scaled_key:
+            region = self.lod_surface.subsurface((first_x, first_y, last_x - first_x, last_y - first_y))
+            size = (max(1, round((last_x - first_x) * tile_size)),
+                    max(1, round((last_y - first_y) * tile_size)))
+            self.lod_scaled = pygame.transform.scale(region, size)
+            self.lod_scaled_key = key
+
+        surface.blit(self.lod_scaled, (round(first_x * tile_size - camera_x),
+                                       round(first_y * tile_size - camera_y)))
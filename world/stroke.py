@@ -0,0 +1,118 @@
+from utils.profiler import profiled
+
+
+def bresenham(x0, y0, x1, y1):
+    """Целочисленные точки отрезка от (x0, y0) до (x1, y1) включительно"""
+    dx = abs(x1 - x0)
+    dy = -abs(y1 - y0)
+    step_x = 1 if x0 < x1 else -1
+    step_y = 1 if y0 < y1 else -1
+    error = dx + dy
+
+    while True:
+        yield x0, y0
+        if x0 == x1 and y0 == y1:
+            return
+        double_error = 2 * error
+        if double_error >= dy:
+            error += dy
+            x0 += step_x
+        if double_error <= dx:
+            error += dx
+            y0 += step_y
+
+
+def merge_intervals(intervals):
+    """Объединяет пересекающиеся и соседние полуинтервалы [a, b)"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def subtract_intervals(intervals, taken):
+    """Вычитает из отсортированных интервалов отсортированные интервалы taken"""
+    result = []
+    for start, end in intervals:
+        for taken_start, taken_end in taken:
+            if taken_end <= start:
+                continue
+            if taken_start >= end:
+                break
+            if taken_start > start:
+                result.append((start, taken_start))
+            start = max(start, taken_end)
+            if start >= end:
+                break
+        if start < end:
+            result.append((start, end))
+    return result
+
+
+class Stroke:
+    """Мазок кисти между последовательными положениями мыши.
+
+    Путь между сэмплами интерполируется линией Брезенхэма, заметаемая маской
+    область растеризуется отрезками по строкам за один проход. Ячейки, уже
+    закрашенные в этом мазке, повторно не записываются.
+    """
+
+    def __init__(self, game_map, tile_type, mask):
+        self.map = game_map
+        self.tile_type = tile_type
+        self.mask = mask
+        self.last_point = None
+        # Уже закрашенные в этом мазке отрезки: строка -> [[x0, x1), ...]
+        self.painted = {}
+
+    @profiled("map.stroke")
+    def add_point(self, x, y):
+        """Продлевает мазок до тайла (x, y). Возвращает затронутую область или None"""
+        if self.last_point is None:
+            points = [(x, y)]
+        else:
+            points = bresenham(self.last_point[0], self.last_point[1], x, y)
+        self.last_point = (x, y)
+
+        # Группируем точки линии в горизонтальные серии с одинаковым y:
+        # сдвиг отрезка маски по серии заметает отрезок [min + dx0, max + dx1)
+        runs = []
+        for px, py in points:
+            if runs and runs[-1][0] == py:
+                run = runs[-1]
+                run[1] = min(run[1], px)
+                run[2] = max(run[2], px)
+            else:
+                runs.append([py, px, px])
+
+        width, height = self.map.width, self.map.height
+        swept = {}
+        for py, run_min, run_max in runs:
+            for dy, dx0, dx1 in self.mask.spans:
+                row = py + dy
+                if not 0 <= row < height:
+                    continue
+                start = max(0, run_min + dx0)
+                end = min(width, run_max + dx1)
+                if start < end:
+                    swept.setdefault(row, []).append((start, end))
+
+        spans = []
+        for row, intervals in swept.items():
+            intervals = merge_intervals(intervals)
+            painted = self.painted.get(row)
+            if painted:
+                fresh = subtract_intervals(intervals, painted)
+                self.painted[row] = merge_intervals(painted + intervals)
+            else:
+                fresh = intervals
+                self.painted[row] = intervals
+            spans.extend((row, start, end) for start, end in fresh)
+
+        if not spans:
+            return None
+        return self.map.paint_spans(spans, self.tile_type)
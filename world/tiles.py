@@ -0,0 +1,57 @@
+TILE_TYPES = {
+    'grass': (50, 200, 50),
+    'sand': (230, 220, 100),
+    'earth': (150, 100, 50),
+    'forest': (0, 150, 0),
+    'water': (0, 100, 200)
+}
+
+# Цвет для тайлов, которых нет в палитре
+UNKNOWN_TILE_COLOR = (100, 100, 100)
+
+MAX_TILE_TYPES = 256
+
+
+class TileRegistry:
+    """Реестр типов тайлов: сопоставляет имена с небольшими целыми ID"""
+
+    def __init__(self, names=()):
+        self.names = []
+        self.ids = {}
+        for name in names:
+            self.register(name)
+
+    def register(self, name):
+        """Регистрирует тип тайла и возвращает его ID"""
+        tile_id = self.ids.get(name)
+        if tile_id is not None:
+            return tile_id
+
+        if len(self.names) >= MAX_TILE_TYPES:
+            raise ValueError(f"Слишком много типов тайлов (максимум {MAX_TILE_TYPES})")
+
+        tile_id = len(self.names)
+        self.names.append(name)
+        self.ids[name] = tile_id
+        return tile_id
+
+    def get_id(self, name):
+        """ID по имени; незнакомые имена регистрируются автоматически"""
+        tile_id = self.ids.get(name)
+        if tile_id is None:
+            tile_id = self.register(name)
+        return tile_id
+
+    def get_name(self, tile_id):
+        return self.names[tile_id]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+
+def default_registry():
+    """Создает реестр со стандартными типами тайлов редактора"""
+    return TileRegistry(TILE_TYPES)